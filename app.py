@@ -40,10 +40,24 @@ DB_NAME = os.getenv('DB_NAME')
 DB_USER = os.getenv('DB_USER')
 DB_PASSWORD = os.getenv('DB_PASSWORD')
 
-# Create SQLAlchemy engine for PostgreSQL
+# Create SQLAlchemy engine for PostgreSQL with connection pooling
 encoded_password = quote_plus(DB_PASSWORD)
 DATABASE_URL = f"postgresql://{DB_USER}:{encoded_password}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_engine(DATABASE_URL)
+
+@st.cache_resource(show_spinner=False)
+def get_engine(url):
+    """Create the pooled engine once per server process, not on every rerun"""
+    return create_engine(
+        url,
+        pool_size=10,
+        max_overflow=20,
+        pool_pre_ping=True,
+        pool_recycle=300,
+        executemany_mode='values_plus_batch',
+        query_cache_size=1200
+    )
+
+engine = get_engine(DATABASE_URL)
 
 # Initialize activity logger with the main engine
 activity_logger = get_logger(engine)
@@ -131,7 +145,7 @@ logger = logging.getLogger(__name__)
 
 from core.database import db_pool
 from core.etl import ETLPipeline
-from core.models import create_tables
+from core.models import create_tables, apply_migrations
 
 # Add the get_available_tables function
 def get_available_tables():
@@ -158,10 +172,22 @@ def initialize_database():
         logger.error(f"Error creating database tables: {e}")
         st.error("Failed to initialize database tables. Please check the logs.")
 
+@st.cache_resource(show_spinner=False)
+def migrate_database():
+    """Apply pending schema migrations once per server process, not on every rerun"""
+    try:
+        apply_migrations()
+        return True
+    except Exception as e:
+        # Cached as well, so a failing migration is not retried on every click
+        logger.error(f"Error applying database migrations: {e}")
+        return False
+
 def render_authenticated_app():
     """Render the main application after authentication"""
     # Initialize database tables
     initialize_database()
+    migrate_database()
 
     # Debug logging for database configuration
     logger.info("Database Configuration:")
@@ -123,6 +123,7 @@ class AuthManager:
             del st.session_state.username
         if 'user_full_name' in st.session_state:
             del st.session_state.user_full_name
+        st.session_state.pop('_created_by', None)
             
         st.rerun()
     
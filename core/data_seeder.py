@@ -584,6 +584,15 @@ class DatabaseSeeder2:
                             timesheet_data,
                             primary_key_columns=['employee_code', 'project_id', 'work_date'])
 
+    def refresh_timesheet_summary(self):
+        """Rebuild the timesheet rollup read by the Timesheet Summary report"""
+        try:
+            self.execute_query("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_timesheet_summary")
+            logger.info("Refreshed mv_timesheet_summary")
+        except Exception as e:
+            # The previous rollup stays readable, so don't fail the upload over it
+            logger.warning(f"Could not refresh mv_timesheet_summary: {e}")
+
     def seed_project_allocations(self, df_allocations: pd.DataFrame, csv_files: Dict[str, str] = None):
         """Seed project allocation data"""
         logger.info("Seeding project allocations...")
@@ -772,6 +781,7 @@ class DatabaseSeeder2:
             if 'timesheet_report' in csv_files and csv_files['timesheet_report'] is not None:
                 logger.info(f"Processing {len(df_timesheet)} timesheet entries")
                 self.seed_timesheets(df_timesheet)
+                self.refresh_timesheet_summary()
                 
             if 'resource_utilization' in csv_files and csv_files['resource_utilization'] is not None:
                 logger.info(f"Processing {len(df_utilization)} resource utilization entries")
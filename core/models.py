@@ -26,4 +26,22 @@ def create_tables():
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Error creating database tables: {e}")
-        raise 
\ No newline at end of file
+        raise 
+def apply_migrations():
+    """Apply schema changes added after the original tables (columns, indexes, views)"""
+    try:
+        creator = DatabaseTableCreator()
+        creator.connect_postgresql(
+            host=db_config.host,
+            database=db_config.database,
+            user=db_config.user,
+            password=db_config.password,
+            port=db_config.port
+        )
+        try:
+            return creator.apply_migrations()
+        finally:
+            creator.close_connection()
+    except Exception as e:
+        logger.error(f"Error applying database migrations: {e}")
+        raise
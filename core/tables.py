@@ -190,6 +190,7 @@ class DatabaseTableCreator:
                 employee_code VARCHAR(20) NOT NULL REFERENCES employee(employee_code),
                 project_id VARCHAR(50) NOT NULL REFERENCES project(project_id),
                 hours_worked DECIMAL(4,2) CHECK (hours_worked >= 0 AND hours_worked <= 24),
+                hours_centi SMALLINT GENERATED ALWAYS AS ((hours_worked * 100)::smallint) STORED,
                 task_description TEXT,
                 allocation_id INTEGER REFERENCES project_allocation(allocation_id),
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -308,6 +309,110 @@ class DatabaseTableCreator:
             # """
         ]
 
+    def get_column_migration_queries(self):
+        """Return (column_name, query) pairs adding columns to existing tables based on database type"""
+
+        if self.db_type == "postgresql":
+            return self._get_postgresql_column_migrations()
+        else:
+            return []
+
+    def _get_postgresql_column_migrations(self):
+        """PostgreSQL columns added after the original schema"""
+        return [
+            # Hours as exact integer hundredths (DECIMAL(4,2) fits in a smallint) for cheap SUMs
+            ("timesheet.hours_centi", """
+            ALTER TABLE timesheet ADD COLUMN IF NOT EXISTS hours_centi SMALLINT
+            GENERATED ALWAYS AS ((hours_worked * 100)::smallint) STORED;
+            """),
+        ]
+
+    def get_index_creation_queries(self):
+        """Return (index_name, query) pairs for secondary indexes based on database type"""
+
+        if self.db_type == "postgresql":
+            return self._get_postgresql_index_queries()
+        else:
+            return []
+
+    def get_view_creation_queries(self):
+        """Return (view_name, query) pairs for materialized views based on database type"""
+
+        if self.db_type == "postgresql":
+            return self._get_postgresql_view_queries()
+        else:
+            return []
+
+    def _get_postgresql_view_queries(self):
+        """PostgreSQL rollups read by the reports instead of the raw fact tables"""
+        return [
+            # Per-employee/project timesheet totals for the Timesheet Summary report
+            ("mv_timesheet_summary", """
+            CREATE MATERIALIZED VIEW IF NOT EXISTS mv_timesheet_summary AS
+            SELECT employee_code,
+                   project_id,
+                   (SUM(hours_centi) / 100.0)::numeric(12,2) AS total_hours,
+                   COUNT(DISTINCT work_date) AS days_worked,
+                   MIN(work_date) AS first_day,
+                   MAX(work_date) AS last_day
+            FROM timesheet
+            GROUP BY employee_code, project_id;
+            """),
+
+            # Unique key so the view can be refreshed CONCURRENTLY
+            ("ux_mv_timesheet_summary", """
+            CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_timesheet_summary
+            ON mv_timesheet_summary (employee_code, project_id);
+            """),
+        ]
+
+    def _get_postgresql_index_queries(self):
+        """PostgreSQL indexes for the allocation and timesheet hot paths"""
+        return [
+            # Per-employee active allocations, latest allocation per project first
+            ("ix_pa_emp_status_proj", """
+            CREATE INDEX IF NOT EXISTS ix_pa_emp_status_proj
+            ON project_allocation (employee_code, status, project_id, allocation_id DESC);
+            """),
+
+            # Per-project resource counts over the effective date range
+            ("ix_pa_proj_dates", """
+            CREATE INDEX IF NOT EXISTS ix_pa_proj_dates
+            ON project_allocation (project_id, status, effective_from, effective_to);
+            """),
+
+            # Report status filters compare on UPPER(status)
+            ("ix_employee_status_upper", """
+            CREATE INDEX IF NOT EXISTS ix_employee_status_upper
+            ON employee ((UPPER(status)));
+            """),
+
+            # Active members of a project (anti-join for available employees)
+            ("ix_pa_proj_emp_status", """
+            CREATE INDEX IF NOT EXISTS ix_pa_proj_emp_status
+            ON project_allocation (project_id, employee_code) WHERE status = 'Active';
+            """),
+
+            # Per-employee/project timesheet rollups (hours carried for index-only scans)
+            ("ix_ts_emp_proj", """
+            CREATE INDEX IF NOT EXISTS ix_ts_emp_proj
+            ON timesheet (employee_code, project_id, work_date) INCLUDE (hours_worked);
+            """),
+
+            # Date-ranged Project Assignments report (covering, for index-only scans)
+            ("ix_ts_workdate_cov", """
+            CREATE INDEX IF NOT EXISTS ix_ts_workdate_cov
+            ON timesheet (work_date, employee_code, project_id) INCLUDE (hours_worked);
+            """),
+
+            # Date-ranged Attendance Records report (covering, for index-only scans)
+            ("ix_att_date_cov", """
+            CREATE INDEX IF NOT EXISTS ix_att_date_cov
+            ON attendance (attendance_date, employee_code)
+            INCLUDE (clock_in_time, clock_out_time, total_hours, attendance_type);
+            """),
+        ]
+
     def _get_sqlite_queries(self):
         """SQLite table creation queries (adapted for SQLite syntax)"""
         return [
@@ -569,6 +674,66 @@ class DatabaseTableCreator:
         finally:
             cursor.close()
 
+    def get_migration_queries(self):
+        """Return (kind, name, query) triples for schema changes made after the original tables"""
+        migrations = []
+        for column_name, query in self.get_column_migration_queries():
+            migrations.append(("column", column_name, query))
+        for index_name, query in self.get_index_creation_queries():
+            migrations.append(("index", index_name, query))
+        # Views come last: mv_timesheet_summary reads the hours_centi column added above
+        for view_name, query in self.get_view_creation_queries():
+            migrations.append(("view", view_name, query))
+        return migrations
+
+    def _migration_exists(self, cursor, kind, name):
+        """Check the catalog so an already applied migration takes no lock at all"""
+        if kind == "column":
+            table_name, column_name = name.split(".")
+            cursor.execute(
+                "SELECT 1 FROM information_schema.columns WHERE table_name = %s AND column_name = %s",
+                (table_name, column_name)
+            )
+            return cursor.fetchone() is not None
+
+        cursor.execute("SELECT to_regclass(%s)", (name,))
+        return cursor.fetchone()[0] is not None
+
+    def apply_migrations(self):
+        """Apply schema changes that are missing; meant to run once, not on every page load"""
+        if not self.connection:
+            raise Exception("No database connection established")
+
+        cursor = self.connection.cursor()
+        applied = []
+        failed = []
+
+        try:
+            for kind, name, query in self.get_migration_queries():
+                if self._migration_exists(cursor, kind, name):
+                    continue
+                try:
+                    cursor.execute(query)
+                    # Commit each change so its lock is released and a later failure cannot undo it
+                    self.connection.commit()
+                    applied.append(name)
+                    logger.info(f"✓ Applied {kind}: {name}")
+                except Exception as e:
+                    # Clear the aborted transaction so the remaining migrations still run
+                    self.connection.rollback()
+                    failed.append((name, str(e)))
+                    logger.error(f"✗ Failed to apply {kind} {name}: {e}")
+
+            logger.info(f"Applied {len(applied)} migrations")
+            if failed:
+                logger.warning(f"Failed to apply {len(failed)} migrations")
+                for name, error in failed:
+                    logger.warning(f"  - {name}: {error}")
+        finally:
+            cursor.close()
+
+        return applied, failed
+
     def close_connection(self):
         """Close database connection"""
         if self.connection:
@@ -611,6 +776,7 @@ def main():
 
         print("\nCreating tables...")
         creator.create_tables()
+        creator.apply_migrations()
         print("\n✓ Table creation process completed!")
 
     except KeyboardInterrupt:
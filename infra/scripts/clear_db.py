@@ -36,6 +36,11 @@ def clear_tables():
         cur.execute(f"DELETE FROM {table};")
         print(f"Cleared table: {table}")
     cur.execute("SET session_replication_role = 'origin';")
+    # Empty the timesheet rollup along with its source table
+    cur.execute("SELECT to_regclass('mv_timesheet_summary');")
+    if cur.fetchone()[0]:
+        cur.execute("REFRESH MATERIALIZED VIEW mv_timesheet_summary;")
+        print("Refreshed view: mv_timesheet_summary")
     cur.close()
     conn.close()
 
@@ -6,6 +6,8 @@ It uses SQLAlchemy for database interactions and follows enterprise-level design
 """
 
 import logging
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Union, Any
 from sqlalchemy import (
@@ -80,6 +82,9 @@ class ActivityLogger:
             # Create session factory
             self.Session = sessionmaker(bind=self.engine)
             
+            # Per-thread buffer used by batch(); each Streamlit session runs in its own thread
+            self._local = threading.local()
+            
             # Ensure the logs table exists
             self.create_logs_table()
         except Exception as e:
@@ -130,6 +135,12 @@ class ActivityLogger:
                 timestamp=datetime.now()
             )
             
+            # Inside batch() the entry is written with the rest of the batch
+            pending = getattr(self._local, 'pending', None)
+            if pending is not None:
+                pending.append(log_entry)
+                return True
+            
             # Add to database
             with self.Session() as session:
                 session.add(log_entry)
@@ -142,6 +153,35 @@ class ActivityLogger:
             logger.error(f"Error logging event: {e}")
             return False
     
+    @contextmanager
+    def batch(self):
+        """
+        Collect the events logged inside the block and write them in one transaction
+        
+        Usage:
+            with logger.batch():
+                for f in files:
+                    logger.log_file_upload(...)
+        """
+        if self.Session is None or getattr(self._local, 'pending', None) is not None:
+            # Logging unavailable or already batching: events go through the normal path
+            yield self
+            return
+        
+        self._local.pending = []
+        try:
+            yield self
+        finally:
+            pending, self._local.pending = self._local.pending, None
+            if pending:
+                try:
+                    with self.Session() as session:
+                        session.add_all(pending)
+                        session.commit()
+                    logger.info(f"Logged {len(pending)} events in one batch")
+                except Exception as e:
+                    logger.error(f"Error logging event batch: {e}")
+    
     def log_file_upload(self, filename: str, file_type: str, user: Optional[str] = None, 
                         status: str = "SUCCESS", details: Optional[Dict[str, Any]] = None) -> bool:
         """
@@ -2,9 +2,194 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, date
 from logs.activity_logger import get_logger
+from pages.custom_queries import query_filter_options
+from pages.employee_master import clear_employee_caches
 from sqlalchemy import text
 import time
 
+# Seconds the resolved created_by employee code is reused before re-checking
+CREATED_BY_CACHE_TTL = 300
+
+# Rows shown per page in the projects list
+PROJECTS_PAGE_SIZE = 50
+
+# SQL statements compiled once at import and reused by the helpers below
+_SQL_GET_EMPLOYEES = text("""
+    SELECT employee_code, employee_name, department_name
+    FROM employee
+    WHERE status = 'Active'
+    ORDER BY employee_name
+""")
+
+_SQL_GET_PROJECTS = text("""
+    SELECT 
+        p.project_id,
+        p.project_name,
+        p.client_name,
+        p.status,
+        p.start_date,
+        p.end_date,
+        p.manager_id,
+        COALESCE(e.employee_name, 'N/A') as manager_name 
+    FROM project p 
+    LEFT JOIN employee e ON p.manager_id = e.employee_code 
+    ORDER BY p.project_name
+""")
+
+_SQL_CHECK_ACTIVE_EMPLOYEE = text("""
+    SELECT employee_code FROM employee 
+    WHERE employee_code = :employee_code AND status = 'Active'
+""")
+
+_SQL_FIRST_ACTIVE_EMPLOYEE = text("""
+    SELECT employee_code FROM employee 
+    WHERE status = 'Active' 
+    ORDER BY employee_code 
+    LIMIT 1
+""")
+
+_SQL_UPDATE_ALLOCATION = text("""
+    WITH old AS (
+        UPDATE project_allocation
+        SET status = 'Inactive'
+        WHERE allocation_id = :allocation_id
+        RETURNING project_id, allocation_percentage, role
+    ),
+    new AS (
+        INSERT INTO project_allocation 
+        (employee_code, project_id, role, allocation_percentage, effective_from, 
+         effective_to, status, created_by, change_reason, created_at)
+        SELECT :employee_code, old.project_id, COALESCE(:role, old.role), :allocation_percentage,
+               :effective_from, :effective_to, :status, :created_by, :change_reason, :created_at
+        FROM old
+        WHERE :status <> 'Active'
+        OR (
+            SELECT COALESCE(SUM(allocation_percentage), 0)
+            FROM project_allocation
+            WHERE employee_code = :employee_code AND status = 'Active'
+            AND allocation_id != :allocation_id
+        ) + :allocation_percentage <= 100
+        RETURNING allocation_id, role
+    )
+    SELECT old.project_id, old.allocation_percentage, old.role, new.allocation_id, new.role
+    FROM old
+    LEFT JOIN new ON TRUE
+""")
+
+_SQL_INSERT_ALLOC = text("""
+    INSERT INTO project_allocation 
+    (employee_code, project_id, role, allocation_percentage, effective_from, 
+     effective_to, status, created_by, change_reason, created_at)
+    VALUES (:employee_code, :project_id, :role, :allocation_percentage, :effective_from, 
+            :effective_to, :status, :created_by, :change_reason, :created_at)
+""")
+
+_SQL_INSERT_PROJECT = text("""
+    INSERT INTO project (project_id, project_name, client_name, manager_id, status, start_date, end_date)
+    VALUES (:project_id, :project_name, :client_name, :manager_id, :status, :start_date, :end_date)
+    ON CONFLICT (project_id) DO NOTHING
+    RETURNING project_id
+""")
+
+_SQL_UPDATE_PROJECT = text("""
+    UPDATE project 
+    SET project_name = :project_name,
+        client_name = :client_name,
+        manager_id = :manager_id,
+        status = :status,
+        start_date = :start_date,
+        end_date = :end_date
+    WHERE project_id = :project_id
+""")
+
+_SQL_CLOSE_PROJECT_ALLOCATIONS = text("""
+    UPDATE project_allocation
+    SET status = 'Inactive',
+        effective_to = CURRENT_DATE
+    WHERE project_id = :project_id
+    AND status = 'Active'
+""")
+
+_SQL_GET_OPEN_PROJECTS = text("""
+    SELECT project_id, project_name
+    FROM project
+    WHERE status != 'Completed'
+    ORDER BY project_name
+""")
+
+_SQL_GET_PROJECT_ALLOCATIONS = text("""
+    SELECT 
+        pa.allocation_id,
+        e.employee_code,
+        e.employee_name,
+        d.department_name,
+        pa.role,
+        pa.allocation_percentage,
+        pa.effective_from,
+        pa.effective_to,
+        pa.status
+    FROM project_allocation pa
+    JOIN employee e ON pa.employee_code = e.employee_code
+    LEFT JOIN department d ON e.department_id = d.department_id
+    WHERE pa.project_id = :project_id
+    ORDER BY pa.status DESC, e.employee_name
+""")
+
+_SQL_GET_AVAILABLE_EMPLOYEES = text("""
+    SELECT e.employee_code, e.employee_name, d.department_name
+    FROM employee e
+    LEFT JOIN department d ON e.department_id = d.department_id
+    WHERE e.status = 'Active'
+    AND NOT EXISTS (
+        SELECT 1
+        FROM project_allocation pa
+        WHERE pa.employee_code = e.employee_code
+        AND pa.project_id = :project_id
+        AND pa.status = 'Active'
+    )
+    ORDER BY e.employee_name
+""")
+
+_SQL_COUNT_PROJECTS = text("SELECT COUNT(*) FROM project WHERE project_name ILIKE :q")
+
+_SQL_GET_PROJECTS_PAGE = text("""
+    SELECT 
+        p.project_id,
+        p.project_name,
+        p.client_name,
+        e.employee_name as manager_name,
+        p.status,
+        p.start_date,
+        p.end_date,
+        COALESCE(pa.active_count, 0) as active_resources,
+        COALESCE(pa.past_count, 0) as past_resources
+    FROM project p
+    LEFT JOIN employee e ON p.manager_id = e.employee_code
+    LEFT JOIN (
+        SELECT
+            project_id,
+            COUNT(DISTINCT employee_code) FILTER (
+                WHERE effective_to IS NULL OR effective_to >= CURRENT_DATE
+            ) as active_count,
+            COUNT(DISTINCT employee_code) FILTER (
+                WHERE effective_to < CURRENT_DATE
+            ) as past_count
+        FROM project_allocation
+        WHERE status = 'Active'
+        AND effective_from <= CURRENT_DATE
+        GROUP BY project_id
+    ) pa ON pa.project_id = p.project_id
+    WHERE p.project_name ILIKE :q
+    ORDER BY 
+        CASE p.status 
+            WHEN 'Active' THEN 1
+            WHEN 'Inactive' THEN 2
+            WHEN 'Completed' THEN 3
+        END,
+        p.project_name
+    LIMIT :lim OFFSET :off
+""")
+
 
 def render_allocations(engine):
     """Render the allocations management page"""
@@ -26,359 +211,166 @@ def render_allocations(engine):
         render_manage_allocations(engine, logger)
 
 
-def get_employees_list(engine):
-    """Get list of all active employees"""
-    try:
-        with engine.connect() as conn:
-            result = conn.execute(text("""
-                SELECT employee_code, employee_name, department_name
-                FROM employee
-                WHERE status = 'Active'
-                ORDER BY employee_name
-            """))
-            return result.fetchall()
-    except Exception as e:
-        st.error(f"Error fetching employees: {e}")
-        return []
+@st.cache_data(ttl=60, show_spinner=False)
+def get_active_managers(_engine):
+    """Get active employees that can be picked as project managers, as code -> (name, department)"""
+    with _engine.connect() as conn:
+        return {
+            row.employee_code: (row.employee_name, row.department_name)
+            for row in conn.execute(_SQL_GET_EMPLOYEES)
+        }
 
 
-def get_employee_details(engine, employee_code):
-    """Get employee basic details"""
-    try:
-        with engine.connect() as conn:
-            result = conn.execute(text("""
-                SELECT employee_code, employee_name, department_name, email, mobile_number
-                FROM employee
-                WHERE employee_code = :employee_code AND status = 'Active'
-            """), {"employee_code": employee_code})
-            return result.fetchone()
-    except Exception as e:
-        st.error(f"Error fetching employee details: {e}")
-        return None
+@st.cache_data(ttl=60, show_spinner=False)
+def get_projects(_engine):
+    """Get every project with its details and manager name"""
+    return pd.read_sql(_SQL_GET_PROJECTS, _engine)
 
 
-def get_employee_allocations(engine, employee_code):
-    """Get current active allocations for an employee"""
-    try:
-        with engine.connect() as conn:
-            result = conn.execute(text("""
-                SELECT DISTINCT
-                    pa.allocation_id,
-                    pa.project_id,
-                    p.project_name,
-                    pa.allocation_percentage,
-                    p.start_date,
-                    p.end_date,
-                    pa.effective_from,
-                    pa.effective_to,
-                    COALESCE(
-                        (SELECT SUM(t.hours_worked) 
-                         FROM timesheet t 
-                         WHERE t.employee_code = pa.employee_code 
-                         AND t.project_id = pa.project_id), 0
-                    ) as total_hours,
-                    COALESCE(
-                        (SELECT COUNT(DISTINCT t.work_date) 
-                         FROM timesheet t 
-                         WHERE t.employee_code = pa.employee_code 
-                         AND t.project_id = pa.project_id), 0
-                    ) as days_worked,
-                    COALESCE(
-                        (SELECT MIN(t.work_date) 
-                         FROM timesheet t 
-                         WHERE t.employee_code = pa.employee_code 
-                         AND t.project_id = pa.project_id), p.start_date
-                    ) as first_day,
-                    COALESCE(
-                        (SELECT MAX(t.work_date) 
-                         FROM timesheet t 
-                         WHERE t.employee_code = pa.employee_code 
-                         AND t.project_id = pa.project_id), p.end_date
-                    ) as last_day
-                FROM project_allocation pa
-                JOIN project p ON pa.project_id = p.project_id
-                WHERE pa.employee_code = :employee_code 
-                AND pa.status = 'Active'
-                AND pa.allocation_id IN (
-                    SELECT MAX(allocation_id) 
-                    FROM project_allocation 
-                    WHERE employee_code = :employee_code 
-                    AND status = 'Active'
-                    GROUP BY project_id
-                )
-                ORDER BY pa.project_id
-            """), {"employee_code": employee_code})
-            return result.fetchall()
-    except Exception as e:
-        st.error(f"Error fetching allocations: {e}")
-        return []
+@st.cache_data(ttl=60, show_spinner=False)
+def get_open_projects(_engine):
+    """Get projects that can still take allocations, as project_id -> project_name"""
+    with _engine.connect() as conn:
+        return {row.project_id: row.project_name for row in conn.execute(_SQL_GET_OPEN_PROJECTS)}
 
 
-def get_valid_created_by(engine):
-    """Get a valid employee code to use as created_by"""
+@st.cache_data(ttl=60, show_spinner=False)
+def get_project_allocations(_engine, project_id):
+    """Get every allocation on a project with employee and department names"""
+    df = pd.read_sql(
+        _SQL_GET_PROJECT_ALLOCATIONS, _engine, params={'project_id': project_id},
+        parse_dates=['effective_from', 'effective_to']
+    )
+    # Low-cardinality labels go to the browser dictionary-encoded
+    for col in ('status', 'department_name'):
+        df[col] = df[col].astype('category')
+    return df
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_available_employees(_engine, project_id):
+    """Get active employees not currently allocated to a project, as code -> (name, department)"""
+    with _engine.connect() as conn:
+        return {
+            row.employee_code: (row.employee_name, row.department_name)
+            for row in conn.execute(_SQL_GET_AVAILABLE_EMPLOYEES, {'project_id': project_id})
+        }
+
+
+def clear_project_caches():
+    """Drop cached project lookups after a project is added or changed"""
+    get_projects.clear()
+    count_projects.clear()
+    get_projects_page.clear()
+    get_open_projects.clear()
+    query_filter_options.clear()
+    # Employee Master profiles carry project names and status
+    clear_employee_caches()
+
+
+def clear_allocation_caches():
+    """Drop cached allocation lookups after an allocation is added or changed"""
+    get_projects_page.clear()
+    get_project_allocations.clear()
+    get_available_employees.clear()
+    # Employee Master profiles list each employee's allocations
+    clear_employee_caches()
+
+
+def get_valid_created_by(engine, conn=None):
+    """Get a valid employee code to use as created_by, memoized per session"""
+    cached = st.session_state.get("_created_by")
+    if cached and time.monotonic() - cached[1] < CREATED_BY_CACHE_TTL:
+        return cached[0]
+
     try:
-        with engine.connect() as conn:
-            # Try to get the current user from session state
-            current_user = st.session_state.get('user')
-            if current_user:
-                result = conn.execute(text("""
-                    SELECT employee_code FROM employee 
-                    WHERE employee_code = :employee_code AND status = 'Active'
-                """), {"employee_code": current_user})
-                if result.fetchone():
-                    return current_user
-
-            # If no valid current user, get the first active employee
-            result = conn.execute(text("""
-                SELECT employee_code FROM employee 
-                WHERE status = 'Active' 
-                ORDER BY employee_code 
-                LIMIT 1
-            """))
-            row = result.fetchone()
-            return row[0] if row else None
+        if conn is None:
+            with engine.connect() as conn:
+                created_by = _resolve_created_by(conn)
+        else:
+            created_by = _resolve_created_by(conn)
+
+        if created_by:
+            st.session_state["_created_by"] = (created_by, time.monotonic())
+        return created_by
     except Exception as e:
         st.error(f"Error getting valid created_by: {e}")
         return None
 
 
-def display_employee_details(employee_details, allocations):
-    """Display employee details card"""
-    emp_code, emp_name, dept_name, email, mobile = employee_details
-
-    # Calculate total allocation
-    total_allocation = sum(allocation[3] for allocation in allocations) if allocations else 0
-
-    st.markdown(f"""
-    **{emp_name} ({emp_code}) - {dept_name}**
-
-    **Email:** {email or 'N/A'}  
-    **Mobile Number:** {mobile or 'N/A'}  
-    **Total Allocation:** {total_allocation:.1f}%
-    """)
-
-    #if total_allocation > 100:
-    #    st.error(f"Warning: Total allocation ({total_allocation:.1f}%) exceeds 100%")
-    #elif total_allocation == 0:
-    #    st.info("No active allocations")
-
-
-def display_allocations_table(engine, allocations, employee_code, logger):
-    """Display allocations table with clickable allocation percentages for editing"""
-    st.markdown("**Project Assignments with Allocation:**")
-
-    # Create columns for the table header (removed Edit column)
-    col_headers = st.columns([1, 2.5, 1, 1, 1.2, 1.2, 1])
-    headers = ["Project", "Project Name", "Hours", "Days", "First Day", "Last Day", "Allocation (%)"]
-
-    for i, header in enumerate(headers):
-        col_headers[i].markdown(f"**{header}**")
-
-    st.markdown("---")
-
-    # Display each allocation row
-    for allocation in allocations:
-        allocation_id, project_id, project_name, allocation_percentage, start_date, end_date, effective_from, effective_to, total_hours, days_worked, first_day, last_day = allocation
-
-        cols = st.columns([1, 2.5, 1, 1, 1.2, 1.2, 1])
-
-        with cols[0]:
-            st.write(project_id)
-        with cols[1]:
-            st.write(project_name)
-        with cols[2]:
-            st.write(f"{total_hours:.1f}")
-        with cols[3]:
-            st.write(str(days_worked))
-        with cols[4]:
-            st.write(str(first_day) if first_day else "N/A")
-        with cols[5]:
-            st.write(str(last_day) if last_day else "N/A")
-        with cols[6]:
-            # Check if this allocation is being edited
-            edit_key = f"edit_{allocation_id}"
-            if st.session_state.get(edit_key, False):
-                # Show edit form as number input
-                new_percentage = st.number_input(
-                    "",
-                    min_value=0.0,
-                    max_value=100.0,
-                    value=float(allocation_percentage),
-                    step=0.1,
-                    key=f"new_percentage_{allocation_id}"
-                )
-                # Auto-store the change when value changes
-                if new_percentage != float(allocation_percentage):
-                    st.session_state[f"pending_change_{allocation_id}"] = {
-                        'new_percentage': new_percentage,
-                        'allocation_id': allocation_id,
-                        'employee_code': employee_code,
-                        'old_percentage': float(allocation_percentage)
-                    }
-            else:
-                # Show clickable allocation percentage
-                if st.button(f"{allocation_percentage:.1f}%", key=f"allocation_btn_{allocation_id}",
-                             help="Click to edit this allocation"):
-                    st.session_state[edit_key] = True
-                    st.rerun()
-
-
-def display_save_changes_section(engine, employee_code, logger):
-    """Display save changes section below all allocation details"""
-    st.markdown("---")
-    st.markdown("### Save Changes")
-
-    # Check if there are any pending changes
-    pending_changes = {}
-    for key in st.session_state.keys():
-        if key.startswith("pending_change_"):
-            allocation_id = key.replace("pending_change_", "")
-            pending_changes[allocation_id] = st.session_state[key]
-
-    if pending_changes:
-        st.markdown("**Pending Changes:**")
-        for allocation_id, change_data in pending_changes.items():
-            old_pct = change_data.get('old_percentage', 0)
-            new_pct = change_data['new_percentage']
-            st.write(f"- Allocation ID {allocation_id}: {old_pct:.1f}% → {new_pct:.1f}%")
-
-        # Reason input for all changes
-        change_reason = st.text_area(
-            "Change Reason (Required for all changes):",
-            key="bulk_change_reason",
-            placeholder="Enter reason for allocation changes...",
-            height=100
-        )
-
-        col_confirm, col_cancel_all = st.columns(2)
-
-        with col_confirm:
-            if st.button("Confirm All Changes", key="confirm_all_changes"):
-                if change_reason.strip():
-                    all_success = True
-                    for allocation_id, change_data in pending_changes.items():
-                        success = update_allocation(
-                            engine,
-                            change_data['allocation_id'],
-                            change_data['employee_code'],
-                            change_data['new_percentage'],
-                            'Active',  # Status remains active for bulk changes
-                            datetime.now().date(),  # Effective from today
-                            None,  # No end date for bulk changes
-                            change_reason.strip(),
-                            logger,
-                            None  # Keep existing role for bulk changes
-                        )
-                        if not success:
-                            all_success = False
-
-                    if all_success:
-                        st.success("All allocations updated successfully!")
-                        # Clear all pending changes and edit states
-                        for allocation_id in pending_changes.keys():
-                            st.session_state.pop(f"edit_{allocation_id}", None)
-                            st.session_state.pop(f"pending_change_{allocation_id}", None)
-                        st.session_state.pop("bulk_change_reason", None)
-                        st.rerun()
-                    else:
-                        st.error("Some allocations failed to update. Please check the logs.")
-                else:
-                    st.error("Change reason is required for all changes")
+def _resolve_created_by(conn):
+    """Look up the current user, falling back to the first active employee"""
+    # Try to get the current user from session state
+    current_user = st.session_state.get('user')
+    if current_user:
+        result = conn.execute(_SQL_CHECK_ACTIVE_EMPLOYEE, {"employee_code": current_user})
+        if result.fetchone():
+            return current_user
 
-        with col_cancel_all:
-            if st.button("Cancel All Changes", key="cancel_all_changes"):
-                # Clear all pending changes and edit states
-                for allocation_id in pending_changes.keys():
-                    st.session_state.pop(f"edit_{allocation_id}", None)
-                    st.session_state.pop(f"pending_change_{allocation_id}", None)
-                st.session_state.pop("bulk_change_reason", None)
-                st.rerun()
-    else:
-        st.info("No pending changes to save")
+    # If no valid current user, get the first active employee
+    result = conn.execute(_SQL_FIRST_ACTIVE_EMPLOYEE)
+    row = result.fetchone()
+    return row[0] if row else None
 
 
 def update_allocation(engine, old_allocation_id, employee_code, new_percentage, new_status, new_effective_from, new_effective_to, change_reason, logger, new_role=None):
     """Update allocation by creating new record and deactivating old one"""
     try:
-        with engine.connect() as conn:
-            # Start transaction
-            trans = conn.begin()
-
-            try:
-                # Get current allocation details
-                result = conn.execute(text("""
-                    SELECT project_id, effective_from, effective_to, allocation_percentage, role
-                    FROM project_allocation
-                    WHERE allocation_id = :allocation_id
-                """), {"allocation_id": old_allocation_id})
-
-                allocation_data = result.fetchone()
-                if not allocation_data:
-                    st.error("Allocation not found")
-                    return False
-
-                project_id, effective_from, effective_to, old_percentage, current_role = allocation_data
-                
-                # Get a valid created_by employee code
-                created_by = get_valid_created_by(engine)
-                if not created_by:
-                    st.error("No valid employee found for created_by field")
-                    return False
-
-                # Deactivate old allocation
-                conn.execute(text("""
-                    UPDATE project_allocation
-                    SET status = 'Inactive'
-                    WHERE allocation_id = :allocation_id
-                """), {"allocation_id": old_allocation_id})
-
-                # Insert new allocation record
-                role_to_use = new_role if new_role is not None else current_role
-                conn.execute(text("""
-                    INSERT INTO project_allocation 
-                    (employee_code, project_id, role, allocation_percentage, effective_from, 
-                     effective_to, status, created_by, change_reason, created_at)
-                    VALUES (:employee_code, :project_id, :role, :allocation_percentage, :effective_from, 
-                            :effective_to, :status, :created_by, :change_reason, :created_at)
-                """), {
-                    "employee_code": employee_code,
-                    "project_id": project_id,
-                    "role": role_to_use,
-                    "allocation_percentage": new_percentage,
-                    "effective_from": new_effective_from,
-                    "effective_to": new_effective_to,
-                    "status": new_status,
-                    "created_by": created_by,
-                    "change_reason": change_reason,
-                    "created_at": datetime.now()
-                })
-
-                # Commit transaction
-                trans.commit()
-
-                # Log the allocation update
-                logger.log_event(
-                    event_type="ALLOCATION_UPDATE",
-                    description=f"Updated allocation for {employee_code} on project {project_id}",
-                    user=st.session_state.get('username', created_by),
-                    details={
-                        "employee_code": employee_code,
-                        "project_id": project_id,
-                        "old_percentage": float(old_percentage),
-                        "new_percentage": new_percentage,
-                        "user_full_name": st.session_state.get('user_full_name', 'Unknown'),
-                        "timestamp": str(datetime.now()),
-                        "old_role": current_role,
-                        "new_role": role_to_use,
-                        "change_reason": change_reason
-                    }
+        with engine.begin() as conn:
+            # Get a valid created_by employee code on the same connection
+            created_by = get_valid_created_by(engine, conn)
+            if not created_by:
+                st.error("No valid employee found for created_by field")
+                return False
+
+            # Deactivate the old allocation and insert its replacement in one statement
+            result = conn.execute(_SQL_UPDATE_ALLOCATION, {
+                "allocation_id": old_allocation_id,
+                "employee_code": employee_code,
+                "role": new_role,
+                "allocation_percentage": new_percentage,
+                "effective_from": new_effective_from,
+                "effective_to": new_effective_to,
+                "status": new_status,
+                "created_by": created_by,
+                "change_reason": change_reason,
+                "created_at": datetime.now()
+            })
+
+            allocation_data = result.fetchone()
+            if not allocation_data:
+                st.error("Allocation not found")
+                return False
+
+            project_id, old_percentage, current_role, new_allocation_id, role_to_use = allocation_data
+            if new_allocation_id is None:
+                # Raising rolls back the deactivation done by the same statement
+                raise ValueError(
+                    f"Total allocation for {employee_code} would exceed 100% with {float(new_percentage):.1f}% on project {project_id}"
                 )
 
-                return True
+        # Drop the cached allocations so the next rerun refetches them
+        clear_allocation_caches()
 
-            except Exception as e:
-                trans.rollback()
-                raise e
+        # Log the allocation update
+        logger.log_event(
+            event_type="ALLOCATION_UPDATE",
+            description=f"Updated allocation for {employee_code} on project {project_id}",
+            user=st.session_state.get('username', created_by),
+            details={
+                "employee_code": employee_code,
+                "project_id": project_id,
+                "old_percentage": float(old_percentage),
+                "new_percentage": new_percentage,
+                "user_full_name": st.session_state.get('user_full_name', 'Unknown'),
+                "timestamp": str(datetime.now()),
+                "old_role": current_role,
+                "new_role": role_to_use,
+                "change_reason": change_reason
+            }
+        )
+
+        return True
 
     except Exception as e:
         st.error(f"Error updating allocation: {e}")
@@ -399,33 +391,28 @@ def update_allocation(engine, old_allocation_id, employee_code, new_percentage,
         return False
 
 
-def validate_total_allocation(engine, employee_code, exclude_allocation_id=None):
-    """Validate that total allocation doesn't exceed 100%"""
-    try:
-        with engine.connect() as conn:
-            if exclude_allocation_id:
-                result = conn.execute(text("""
-                    SELECT SUM(allocation_percentage)
-                    FROM project_allocation
-                    WHERE employee_code = :employee_code AND status = 'Active'
-                    AND allocation_id != :exclude_allocation_id
-                """), {
-                    "employee_code": employee_code,
-                    "exclude_allocation_id": exclude_allocation_id
-                })
-            else:
-                result = conn.execute(text("""
-                    SELECT SUM(allocation_percentage)
-                    FROM project_allocation
-                    WHERE employee_code = :employee_code AND status = 'Active'
-                """), {"employee_code": employee_code})
+@st.cache_data(ttl=30, show_spinner=False)
+def count_projects(_engine, search=""):
+    """Count projects whose name matches the search filter"""
+    with _engine.connect() as conn:
+        return conn.execute(
+            _SQL_COUNT_PROJECTS,
+            {"q": f"%{search}%"}
+        ).scalar()
 
-            row = result.fetchone()
-            return float(row[0]) if row[0] else 0.0
 
-    except Exception as e:
-        st.error(f"Error validating allocation: {e}")
-        return 0.0
+@st.cache_data(ttl=30, show_spinner=False)
+def get_projects_page(_engine, search, page):
+    """Get one page of projects with their managers and allocation counts"""
+    params = {
+        "q": f"%{search}%",
+        "lim": PROJECTS_PAGE_SIZE,
+        "off": (page - 1) * PROJECTS_PAGE_SIZE
+    }
+    with _engine.connect() as conn:
+        # Server-side cursor so the page is read without buffering the whole result
+        result = conn.execution_options(stream_results=True).execute(_SQL_GET_PROJECTS_PAGE, params)
+        return pd.DataFrame.from_records(result.fetchmany(PROJECTS_PAGE_SIZE), columns=list(result.keys()))
 
 
 def render_projects_list(engine, logger):
@@ -433,7 +420,8 @@ def render_projects_list(engine, logger):
     st.header("Projects List")
     
     # Add new project section
-    with st.expander("Add New Project", expanded=False):
+    # Keep the form open across the rerun that follows a submit
+    with st.expander("Add New Project", expanded=st.session_state.get("_add_project_expander_open", False)):
         with st.form("add_project_form"):
             col1, col2 = st.columns(2)
             with col1:
@@ -442,18 +430,13 @@ def render_projects_list(engine, logger):
                 client_name = st.text_input("Client Name", placeholder="Enter client name")
             
             with col2:
-                # Get managers list for selection
-                managers_df = pd.read_sql(text("""
-                    SELECT e.employee_code, e.employee_name, e.department_name
-                    FROM employee e
-                    WHERE e.status = 'Active'
-                    ORDER BY e.employee_name
-                """), engine)
+                # Get managers list for selection (cached, so idle reruns skip the query)
+                managers = get_active_managers(engine)
                 
                 manager = st.selectbox(
                     "Project Manager",
-                    options=managers_df['employee_code'].tolist(),
-                    format_func=lambda x: f"{managers_df[managers_df['employee_code']==x]['employee_name'].iloc[0]} ({managers_df[managers_df['employee_code']==x]['department_name'].iloc[0]})"
+                    options=list(managers),
+                    format_func=lambda x: f"{managers[x][0]} ({managers[x][1]})"
                 )
                 
                 start_date = st.date_input("Start Date", min_value=date.today())
@@ -461,146 +444,105 @@ def render_projects_list(engine, logger):
                 status = st.selectbox("Status", ["Active", "Inactive", "Completed"])
             
             submit = st.form_submit_button("Add Project")
+            if submit:
+                st.session_state["_add_project_expander_open"] = True
             
             if submit and project_id and project_name:
                 try:
-                    with engine.connect() as conn:
-                        # Start transaction
-                        trans = conn.begin()
-                        try:
-                            # Check if project ID already exists
-                            result = conn.execute(text("""
-                                SELECT COUNT(*) FROM project WHERE project_id = :project_id
-                            """), {"project_id": project_id})
-                            
-                            if result.scalar() > 0:
-                                st.error(f"Project ID '{project_id}' already exists. Please use a unique ID.")
-                                return
-
-                            # Insert the new project
-                            conn.execute(text("""
-                                INSERT INTO project (project_id, project_name, client_name, manager_id, status, start_date, end_date)
-                                VALUES (:project_id, :project_name, :client_name, :manager_id, :status, :start_date, :end_date)
-                            """), {
-                                "project_id": project_id,
-                                "project_name": project_name,
-                                "client_name": client_name,
-                                "manager_id": manager,
-                                "status": status,
-                                "start_date": start_date,
-                                "end_date": end_date
-                            })
-                            
-                            # Commit the transaction
-                            trans.commit()
-                            
-                            logger.log_event(
-                                event_type="PROJECT_CREATE",
-                                description=f"Created new project {project_name}",
-                                user=st.session_state.get('user', 'system'),
-                                details={
-                                    'project_id': project_id,
-                                    'project_name': project_name,
-                                    'client_name': client_name,
-                                    'manager_id': manager,
-                                    'status': status,
-                                    'start_date': str(start_date),
-                                    'end_date': str(end_date)
-                                }
-                            )
-                            st.success("Project added successfully!")
-                            time.sleep(0.1)  # Small delay to ensure the database transaction is complete
-                            st.rerun()
-                        except Exception as e:
-                            trans.rollback()
-                            raise e
+                    # engine.begin() commits on exit and rolls back on error
+                    with engine.begin() as conn:
+                        # Insert the new project; an existing project ID inserts nothing
+                        row = conn.execute(_SQL_INSERT_PROJECT, {
+                            "project_id": project_id,
+                            "project_name": project_name,
+                            "client_name": client_name,
+                            "manager_id": manager,
+                            "status": status,
+                            "start_date": start_date,
+                            "end_date": end_date
+                        }).fetchone()
+                    
+                    if row is None:
+                        st.error(f"Project ID '{project_id}' already exists. Please use a unique ID.")
+                        return
+                    
+                    logger.log_event(
+                        event_type="PROJECT_CREATE",
+                        description=f"Created new project {project_name}",
+                        user=st.session_state.get('user', 'system'),
+                        details={
+                            'project_id': project_id,
+                            'project_name': project_name,
+                            'client_name': client_name,
+                            'manager_id': manager,
+                            'status': status,
+                            'start_date': str(start_date),
+                            'end_date': str(end_date)
+                        }
+                    )
+                    clear_project_caches()
+                    st.session_state["_add_project_expander_open"] = False
                 except Exception as e:
                     st.error(f"Error adding project: {str(e)}")
+                else:
+                    st.success("Project added successfully!")
+                    st.rerun()
     
     st.subheader("All Projects")
     
     try:
         # Get total count of projects
-        with engine.connect() as conn:
-            count_result = conn.execute(text("SELECT COUNT(*) FROM project")).scalar()
-            total_projects = count_result
-            st.write(f"Total projects in database: {total_projects}")
-            
-            if total_projects == 0:
-                st.warning("No projects found in the database.")
-                return
-        
-        # Fetch projects with their managers and allocation counts
-        query = """
-        SELECT 
-            p.project_id,
-            p.project_name,
-            p.client_name,
-            e.employee_name as manager_name,
-            p.status,
-            p.start_date,
-            p.end_date,
-            COALESCE(active.count, 0) as active_resources,
-            COALESCE(inactive.count, 0) as past_resources
-        FROM project p
-        LEFT JOIN employee e ON p.manager_id = e.employee_code
-        LEFT JOIN (
-            SELECT project_id, COUNT(DISTINCT employee_code) as count
-            FROM project_allocation
-            WHERE status = 'Active'
-            AND effective_from <= CURRENT_DATE
-            AND (effective_to IS NULL OR effective_to >= CURRENT_DATE)
-            GROUP BY project_id
-        ) active ON active.project_id = p.project_id
-        LEFT JOIN (
-            SELECT project_id, COUNT(DISTINCT employee_code) as count
-            FROM project_allocation
-            WHERE status = 'Active'
-            AND effective_from <= CURRENT_DATE
-            AND effective_to < CURRENT_DATE
-            GROUP BY project_id
-        ) inactive ON inactive.project_id = p.project_id
-        ORDER BY 
-            CASE p.status 
-                WHEN 'Active' THEN 1
-                WHEN 'Inactive' THEN 2
-                WHEN 'Completed' THEN 3
-            END,
-            p.project_name
-        """
-        
-        with engine.connect() as conn:
-            df = pd.read_sql_query(text(query), conn)
-            
-            # Configure and display the dataframe
-            st.dataframe(
-                df,
-                hide_index=True,
-                column_config={
-                    "project_id": "Project ID",
-                    "project_name": "Project Name",
-                    "client_name": "Client",
-                    "manager_name": "Project Manager",
-                    "status": st.column_config.SelectboxColumn(
-                        "Status",
-                        help="Project status",
-                        options=["Active", "Inactive", "Completed"],
-                        required=True
-                    ),
-                    "start_date": "Start Date",
-                    "end_date": "End Date",
-                    "active_resources": st.column_config.NumberColumn(
-                        "Active Resources",
-                        help="Number of currently active team members"
-                    ),
-                    "past_resources": st.column_config.NumberColumn(
-                        "Past Resources",
-                        help="Number of previously allocated team members"
-                    )
-                },
-                use_container_width=True
-            )
-        
+        total_projects = count_projects(engine)
+        st.write(f"Total projects in database: {total_projects}")
+
+        if total_projects == 0:
+            st.warning("No projects found in the database.")
+            return
+
+        # Filter and page through projects on the server
+        col_search, col_page = st.columns([3, 1])
+        with col_search:
+            search = st.text_input("Filter project name", key="projects_list_search").strip()
+        matching_projects = count_projects(engine, search) if search else total_projects
+        page_count = max(1, -(-matching_projects // PROJECTS_PAGE_SIZE))
+        if st.session_state.get("projects_list_page", 1) > page_count:
+            st.session_state["projects_list_page"] = page_count
+        with col_page:
+            page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1,
+                                   key="projects_list_page")
+        st.caption(f"Showing page {page} of {page_count} ({matching_projects} matching projects)")
+
+        df = get_projects_page(engine, search, page)
+
+        # Configure and display the dataframe
+        st.dataframe(
+            df,
+            hide_index=True,
+            column_config={
+                "project_id": "Project ID",
+                "project_name": "Project Name",
+                "client_name": "Client",
+                "manager_name": "Project Manager",
+                "status": st.column_config.SelectboxColumn(
+                    "Status",
+                    help="Project status",
+                    options=["Active", "Inactive", "Completed"],
+                    required=True
+                ),
+                "start_date": "Start Date",
+                "end_date": "End Date",
+                "active_resources": st.column_config.NumberColumn(
+                    "Active Resources",
+                    help="Number of currently active team members"
+                ),
+                "past_resources": st.column_config.NumberColumn(
+                    "Past Resources",
+                    help="Number of previously allocated team members"
+                )
+            },
+            use_container_width=True
+        )
+    
     except Exception as e:
         st.error(f"Error loading projects: {str(e)}")
         logger.log_event(
@@ -615,176 +557,113 @@ def render_edit_project(engine, logger):
     st.header("Edit Project")
     
     # Get list of projects
-    projects_df = pd.read_sql(
-        "SELECT project_id, project_name, status FROM project ORDER BY project_name", 
-        engine
-    )
+    projects_df = get_projects(engine)
+    projects_by_id = projects_df.set_index('project_id')
     
     # Project selection
     project_id = st.selectbox(
         "Select Project",
         projects_df['project_id'].tolist(),
-        format_func=lambda x: f"{x} - {projects_df[projects_df['project_id'] == x]['project_name'].iloc[0]} ({projects_df[projects_df['project_id'] == x]['status'].iloc[0]})"
+        format_func=lambda x: f"{x} - {projects_by_id.at[x, 'project_name']} ({projects_by_id.at[x, 'status']})"
     )
     
     if project_id:
-        # Get project details
-        query = """
-        SELECT 
-            p.project_id,
-            p.project_name,
-            p.client_name,
-            p.status,
-            p.start_date,
-            p.end_date,
-            p.manager_id,
-            COALESCE(e.employee_name, 'N/A') as manager_name 
-        FROM project p 
-        LEFT JOIN employee e ON p.manager_id = e.employee_code 
-        WHERE p.project_id = :project_id
-        """
-        project_df = pd.read_sql(text(query), engine, params={'project_id': project_id})
+        # Project details come from the cached list, no second query
+        project = projects_by_id.loc[project_id]
+        
+        # Get list of potential managers
+        managers = get_active_managers(engine)
         
-        if not project_df.empty:
-            project = project_df.iloc[0]
+        # Edit form
+        with st.form("edit_project_form"):
+            new_name = st.text_input("Project Name", project['project_name'])
+            new_client = st.text_input("Client Name", project['client_name'] or "")
             
-            # Get list of potential managers
-            managers_df = pd.read_sql(
-                "SELECT employee_code, employee_name FROM employee WHERE status = 'Active' ORDER BY employee_name",
-                engine
+            # Handle manager selection
+            current_manager_id = project['manager_id'] if pd.notnull(project['manager_id']) else None
+            code_to_name = {code: name for code, (name, _) in managers.items()}
+            manager_options = list(code_to_name)
+            default_index = manager_options.index(current_manager_id) if current_manager_id in code_to_name else 0
+            
+            new_manager = st.selectbox(
+                "Project Manager",
+                manager_options,
+                format_func=code_to_name.get,
+                index=default_index
             )
+            new_status = st.selectbox("Status", ['Active', 'Inactive', 'Completed'], 
+                                    index=['Active', 'Inactive', 'Completed'].index(project['status']))
+            new_start_date = st.date_input("Start Date", project['start_date'])
+            new_end_date = st.date_input("End Date", project['end_date'] if project['end_date'] else None)
             
-            # Edit form
-            with st.form("edit_project_form"):
-                new_name = st.text_input("Project Name", project['project_name'])
-                new_client = st.text_input("Client Name", project['client_name'] or "")
-                
-                # Handle manager selection
-                current_manager_id = project['manager_id'] if pd.notnull(project['manager_id']) else None
-                manager_options = managers_df['employee_code'].tolist()
-                default_index = next((i for i, x in enumerate(manager_options) if x == current_manager_id), 0) if current_manager_id else 0
-                
-                new_manager = st.selectbox(
-                    "Project Manager",
-                    manager_options,
-                    format_func=lambda x: managers_df[managers_df['employee_code'] == x]['employee_name'].iloc[0],
-                    index=default_index
-                )
-                new_status = st.selectbox("Status", ['Active', 'Inactive', 'Completed'], 
-                                        index=['Active', 'Inactive', 'Completed'].index(project['status']))
-                new_start_date = st.date_input("Start Date", project['start_date'])
-                new_end_date = st.date_input("End Date", project['end_date'] if project['end_date'] else None)
-                
-                if st.form_submit_button("Update Project"):
-                    try:
-                        with engine.connect() as conn:
-                            # Start transaction
-                            trans = conn.begin()
-                            try:
-                                # Update project details
-                                conn.execute(text("""
-                                    UPDATE project 
-                                    SET project_name = :project_name,
-                                        client_name = :client_name,
-                                        manager_id = :manager_id,
-                                        status = :status,
-                                        start_date = :start_date,
-                                        end_date = :end_date
-                                    WHERE project_id = :project_id
-                                """), {
-                                    "project_id": project_id,
-                                    "project_name": new_name,
-                                    "client_name": new_client,
-                                    "manager_id": new_manager,
-                                    "status": new_status,
-                                    "start_date": new_start_date,
-                                    "end_date": new_end_date
-                                })
-                                
-                                # If project is marked as Completed, deactivate all active allocations
-                                if new_status == 'Completed':
-                                    conn.execute(text("""
-                                        UPDATE project_allocation
-                                        SET status = 'Inactive',
-                                            effective_to = CURRENT_DATE
-                                        WHERE project_id = :project_id
-                                        AND status = 'Active'
-                                    """), {"project_id": project_id})
-                                
-                                # Commit the transaction
-                                trans.commit()
-                                
-                                logger.log_event(
-                                    event_type="PROJECT_UPDATE",
-                                    description=f"Updated project {project_id}",
-                                    user=st.session_state.get('user', 'system'),
-                                    details={
-                                        'project_id': project_id,
-                                        'new_name': new_name,
-                                        'new_status': new_status,
-                                        'new_manager': new_manager
-                                    }
-                                )
-                                
-                                st.success("Project updated successfully!")
-                                st.rerun()
-                            except Exception as e:
-                                trans.rollback()
-                                raise e
-                    except Exception as e:
-                        st.error(f"Error updating project: {str(e)}")
+            if st.form_submit_button("Update Project"):
+                try:
+                    with engine.begin() as conn:
+                        # Update project details
+                        conn.execute(_SQL_UPDATE_PROJECT, {
+                            "project_id": project_id,
+                            "project_name": new_name,
+                            "client_name": new_client,
+                            "manager_id": new_manager,
+                            "status": new_status,
+                            "start_date": new_start_date,
+                            "end_date": new_end_date
+                        })
+                        
+                        # If project is marked as Completed, deactivate all active allocations
+                        if new_status == 'Completed':
+                            conn.execute(_SQL_CLOSE_PROJECT_ALLOCATIONS, {"project_id": project_id})
+                    
+                    logger.log_event(
+                        event_type="PROJECT_UPDATE",
+                        description=f"Updated project {project_id}",
+                        user=st.session_state.get('user', 'system'),
+                        details={
+                            'project_id': project_id,
+                            'new_name': new_name,
+                            'new_status': new_status,
+                            'new_manager': new_manager
+                        }
+                    )
+                    
+                    clear_project_caches()
+                except Exception as e:
+                    st.error(f"Error updating project: {str(e)}")
+                else:
+                    st.success("Project updated successfully!")
+                    st.rerun()
 
 def render_manage_allocations(engine, logger):
     """Manage project allocations"""
     st.header("Manage Project Allocations")
     
     # Get list of projects
-    projects_df = pd.read_sql(
-        "SELECT project_id, project_name, status FROM project WHERE status != 'Completed' ORDER BY project_name", 
-        engine
-    )
+    proj_name = get_open_projects(engine)
     
     # Project selection
     project_id = st.selectbox(
         "Select Project",
-        projects_df['project_id'].tolist(),
-        format_func=lambda x: f"{x} - {projects_df[projects_df['project_id'] == x]['project_name'].iloc[0]}",
+        list(proj_name),
+        format_func=lambda x: f"{x} - {proj_name[x]}",
         key="allocation_project"
     )
     
     if project_id:
         # Show current allocations
         st.subheader("Current Team Members")
-        query = """
-        SELECT 
-            pa.allocation_id,
-            e.employee_code,
-            e.employee_name,
-            d.department_name,
-            pa.role,
-            pa.allocation_percentage,
-            pa.effective_from,
-            pa.effective_to,
-            pa.status
-        FROM project_allocation pa
-        JOIN employee e ON pa.employee_code = e.employee_code
-        LEFT JOIN department d ON e.department_id = d.department_id
-        WHERE pa.project_id = :project_id
-        ORDER BY pa.status DESC, e.employee_name
-        """
-        allocations_df = pd.read_sql(text(query), engine, params={'project_id': project_id})
+        allocations_df = get_project_allocations(engine, project_id)
         
         if not allocations_df.empty:
             st.dataframe(
-                allocations_df[['employee_name', 'department_name', 'role', 'allocation_percentage', 'effective_from', 'effective_to', 'status']],
+                allocations_df.loc[:, ['employee_name', 'department_name', 'role', 'allocation_percentage', 'effective_from', 'effective_to', 'status']],
                 hide_index=True,
                 column_config={
                     "employee_name": "Employee Name",
                     "department_name": "Department",
                     "role": "Role",
                     "allocation_percentage": "Allocation %",
-                    "effective_from": "Start Date",
-                    "effective_to": "End Date",
+                    "effective_from": st.column_config.DateColumn("Start Date"),
+                    "effective_to": st.column_config.DateColumn("End Date"),
                     "status": "Status"
                 }
             )
@@ -794,16 +673,20 @@ def render_manage_allocations(engine, logger):
             # Create unique form key for edit allocation
             edit_form_id = "edit_allocation_form"
             with st.form(edit_form_id):
-                st.subheader("Edit Allocation")
+                alloc_indexed = allocations_df.set_index('allocation_id')
+                alloc_info = {
+                    row.allocation_id: (row.employee_name, row.status)
+                    for row in allocations_df.itertuples()
+                }
                 allocation_id = st.selectbox(
                     "Select Member to Edit",
                     allocations_df['allocation_id'].tolist(),
-                    format_func=lambda x: f"{allocations_df[allocations_df['allocation_id'] == x]['employee_name'].iloc[0]} ({allocations_df[allocations_df['allocation_id'] == x]['status'].iloc[0]})",
+                    format_func=lambda x: f"{alloc_info[x][0]} ({alloc_info[x][1]})",
                     key="allocation_select"
                 )
                 
                 if allocation_id:
-                    current = allocations_df[allocations_df['allocation_id'] == allocation_id].iloc[0]
+                    current = alloc_indexed.loc[allocation_id]
                     
                     col1, col2 = st.columns(2)
                     with col1:
@@ -827,8 +710,9 @@ def render_manage_allocations(engine, logger):
                         )
                     
                     with col2:
-                        current_from = pd.to_datetime(current['effective_from']).date() if pd.notna(current['effective_from']) else date.today()
-                        current_to = pd.to_datetime(current['effective_to']).date() if pd.notna(current['effective_to']) else None
+                        # Dates arrive as Timestamps (parse_dates), so no re-parsing here
+                        current_from = current['effective_from'].date() if pd.notna(current['effective_from']) else date.today()
+                        current_to = current['effective_to'].date() if pd.notna(current['effective_to']) else None
                         
                         new_effective_from = st.date_input(
                             "Effective From",
@@ -849,11 +733,22 @@ def render_manage_allocations(engine, logger):
                         if not change_reason:
                             st.error("Please provide a reason for the change")
                         else:
+                            employee_code = current['employee_code']
+                            details = {
+                                'allocation_id': allocation_id,
+                                'project_id': project_id,
+                                'employee_code': employee_code,
+                                'old_percentage': float(current['allocation_percentage']),
+                                'new_percentage': float(new_percentage),
+                                'old_status': current['status'],
+                                'new_status': new_status,
+                                'change_reason': change_reason
+                            }
                             try:
                                 success = update_allocation(
                                     engine,
                                     allocation_id,
-                                    current['employee_code'],
+                                    employee_code,
                                     new_percentage,
                                     new_status,
                                     new_effective_from,
@@ -866,17 +761,9 @@ def render_manage_allocations(engine, logger):
                                     # Log the activity
                                     logger.log_event(
                                         event_type="ALLOCATION_UPDATE",
-                                        description=f"Updated allocation for {current['employee_code']} on project {project_id}",
+                                        description=f"Updated allocation for {employee_code} on project {project_id}",
                                         user=st.session_state.get('user', 'system'),
-                                        details={
-                                            'allocation_id': allocation_id,
-                                            'project_id': project_id,
-                                            'employee_code': current['employee_code'],                                        'old_percentage': float(current['allocation_percentage']),
-                                        'new_percentage': float(new_percentage),
-                                        'old_status': current['status'],
-                                        'new_status': new_status,
-                                        'change_reason': change_reason
-                                        }
+                                        details=details
                                     )
                                     st.success("Allocation updated successfully!")
                                     st.rerun()
@@ -889,25 +776,13 @@ def render_manage_allocations(engine, logger):
         st.subheader("Add New Team Member")
         with st.form("add_resource_form"):
             # Get available employees (not currently allocated to this project)
-            available_employees_query = """
-            SELECT e.employee_code, e.employee_name, d.department_name
-            FROM employee e
-            LEFT JOIN department d ON e.department_id = d.department_id
-            WHERE e.status = 'Active'
-            AND e.employee_code NOT IN (
-                SELECT employee_code
-                FROM project_allocation
-                WHERE project_id = :project_id AND status = 'Active'
-            )
-            ORDER BY e.employee_name
-            """
-            available_employees_df = pd.read_sql(text(available_employees_query), engine, params={'project_id': project_id})
+            employee_info = get_available_employees(engine, project_id)
             
-            if not available_employees_df.empty:
+            if employee_info:
                 selected_employee = st.selectbox(
                     "Select Employee",
-                    options=available_employees_df['employee_code'].tolist(),
-                    format_func=lambda x: f"{available_employees_df[available_employees_df['employee_code']==x]['employee_name'].iloc[0]} ({available_employees_df[available_employees_df['employee_code']==x]['department_name'].iloc[0]})"
+                    options=list(employee_info),
+                    format_func=lambda x: f"{employee_info[x][0]} ({employee_info[x][1]})"
                 )
                 
                 allocation_percentage = st.number_input("Allocation Percentage", min_value=0, max_value=100, value=100)
@@ -919,59 +794,44 @@ def render_manage_allocations(engine, logger):
                 
                 if submit_clicked:
                     try:
-                        with engine.connect() as conn:
-                            # Start transaction
-                            trans = conn.begin()
-                            try:
-                                # Get a valid created_by employee code
-                                created_by = get_valid_created_by(engine)
-                                if not created_by:
-                                    st.error("No valid employee found for created_by field")
-                                    return
-                                
-                                # Insert new allocation
-                                conn.execute(text("""
-                                    INSERT INTO project_allocation 
-                                    (employee_code, project_id, role, allocation_percentage, effective_from, 
-                                     effective_to, status, created_by, change_reason, created_at)
-                                    VALUES (:employee_code, :project_id, :role, :allocation_percentage, :effective_from, 
-                                            :effective_to, :status, :created_by, :change_reason, :created_at)
-                                """), {
-                                    "employee_code": selected_employee,
-                                    "project_id": project_id,
-                                    "role": role_in_project,
-                                    "allocation_percentage": allocation_percentage,
-                                    "effective_from": effective_from,
-                                    "effective_to": effective_to,
-                                    "status": "Active",
-                                    "created_by": created_by,
-                                    "change_reason": f"Initial allocation with role: {role_in_project}",
-                                    "created_at": datetime.now()
-                                })
-                                
-                                # Commit the transaction
-                                trans.commit()
-                                
-                                logger.log_event(
-                                    event_type="ALLOCATION_CREATE",
-                                    description=f"Added new team member to project {project_id}",
-                                    user=st.session_state.get('user', created_by),
-                                    details={
-                                        'project_id': project_id,
-                                        'employee_code': selected_employee,
-                                        'allocation_percentage': allocation_percentage
-                                    }
-                                )
-                                
-                                st.success("Team member added successfully!")
-                                st.rerun()
-                                
-                            except Exception as e:
-                                trans.rollback()
-                                raise e
-                                
+                        with engine.begin() as conn:
+                            # Get a valid created_by employee code
+                            created_by = get_valid_created_by(engine, conn)
+                            if not created_by:
+                                st.error("No valid employee found for created_by field")
+                                return
+                            
+                            # Insert new allocation
+                            conn.execute(_SQL_INSERT_ALLOC, {
+                                "employee_code": selected_employee,
+                                "project_id": project_id,
+                                "role": role_in_project,
+                                "allocation_percentage": allocation_percentage,
+                                "effective_from": effective_from,
+                                "effective_to": effective_to,
+                                "status": "Active",
+                                "created_by": created_by,
+                                "change_reason": f"Initial allocation with role: {role_in_project}",
+                                "created_at": datetime.now()
+                            })
+                        clear_allocation_caches()
+                        
+                        logger.log_event(
+                            event_type="ALLOCATION_CREATE",
+                            description=f"Added new team member to project {project_id}",
+                            user=st.session_state.get('user', created_by),
+                            details={
+                                'project_id': project_id,
+                                'employee_code': selected_employee,
+                                'allocation_percentage': allocation_percentage
+                            }
+                        )
+                        
                     except Exception as e:
                         st.error(f"Error adding team member: {str(e)}")
+                    else:
+                        st.success("Team member added successfully!")
+                        st.rerun()
             else:
                 st.info("No available employees to add to this project.")
                 # Add a disabled submit button to satisfy Streamlit's form requirements
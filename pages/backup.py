@@ -1,13 +1,29 @@
 import streamlit as st
 import subprocess
+import heapq
+import gzip
+import zlib
 import os
-import glob
-import json
 from datetime import datetime, timedelta
 from pathlib import Path
-import pandas as pd
+from sqlalchemy import text
 from logs.activity_logger import get_logger
 
+# Most recent backups listed in the history table
+BACKUP_HISTORY_LIMIT = 50
+
+# Backup file -> user name, pulled straight out of the JSON log details.
+# details is free text, so only rows that look like a JSON object are cast;
+# one bad row would otherwise fail the whole query
+_SQL_BACKUP_USERS = text("""
+    SELECT details::json->>'backup_file' AS backup_file,
+           COALESCE(details::json->>'user_name', "user") AS user_name
+    FROM system_logs
+    WHERE event_type = 'MANUAL_BACKUP' AND ltrim(details) LIKE '{%'
+    ORDER BY timestamp DESC
+    LIMIT 100
+""")
+
 def render_backup_page():
     """Render the backup management page"""
     st.header("Database Backup Management")
@@ -94,6 +110,10 @@ def render_manual_backup(logger):
 def create_manual_backup(reason, logger):
     """Create a manual backup with progress indication"""
     
+    # Who is running the backup, read once for every log entry below
+    user_name_display = st.session_state.get('backup_user_name', 'Unknown')
+    username = st.session_state.get('username', 'hr_user')
+    
     # Show progress
     progress_bar = st.progress(0)
     status_text = st.empty()
@@ -102,10 +122,6 @@ def create_manual_backup(reason, logger):
         status_text.text("🔄 Initializing backup...")
         progress_bar.progress(10)
         
-        # Create backup using direct PostgreSQL connection
-        import sqlalchemy
-        from sqlalchemy import create_engine, text
-        
         status_text.text("🔄 Connecting to database...")
         progress_bar.progress(20)
         
@@ -115,9 +131,9 @@ def create_manual_backup(reason, logger):
         
         # Generate timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = f"{backup_dir}/employee_db_backup_{timestamp}.sql"
+        compressed_file = f"{backup_dir}/employee_db_backup_{timestamp}.sql.gz"
         
-        status_text.text("🔄 Creating database dump...")
+        status_text.text("🔄 Creating compressed database dump...")
         progress_bar.progress(40)
         
         # Use pg_dump directly within the same network
@@ -127,8 +143,13 @@ def create_manual_backup(reason, logger):
             "-h", "postgres",  # Use service name from docker-compose
             "-U", "postgres", 
             "-d", "employee_db",
+            "-n", "public",  # only the application schema
+            # Ownership, grants, comments and replication objects are not needed to restore the data
+            "--no-owner", "--no-privileges", "--no-comments",
+            "--no-publications", "--no-subscriptions",
             "--clean", "--if-exists",
-            "-f", backup_file
+            "-Z", "6",  # pg_dump gzips plain-format output itself
+            "-f", compressed_file
         ]
         
         # Set environment variable for password (no password prompt)
@@ -136,16 +157,15 @@ def create_manual_backup(reason, logger):
         env['PGPASSWORD'] = 'postgres123'  # From docker-compose
         
         result = subprocess.run(cmd, env=env, capture_output=True, text=True)
+        dump_errors = result.stderr
         
-        if result.returncode == 0:
-            status_text.text("🔄 Compressing backup...")
-            progress_bar.progress(70)
-            
-            # Compress backup
-            compress_cmd = ["gzip", backup_file]
-            subprocess.run(compress_cmd, check=True)
-            compressed_file = f"{backup_file}.gz"
-            
+        backup_ok = result.returncode == 0
+        if not backup_ok:
+            # Drop the partial archive so it is not listed as a backup
+            if os.path.exists(compressed_file):
+                os.remove(compressed_file)
+        
+        if backup_ok:
             status_text.text("🔄 Verifying backup...")
             progress_bar.progress(90)
             
@@ -157,21 +177,23 @@ def create_manual_backup(reason, logger):
                 # Log the manual backup
                 logger.log_event(
                     event_type="MANUAL_BACKUP",
-                    description=f"Manual backup created by {st.session_state.get('backup_user_name', 'user')}",
-                    user=st.session_state.get('username', 'hr_user'),
+                    description=f"Manual backup created by {user_name_display}",
+                    user=username,
                     details={
                         "backup_file": compressed_file,
                         "reason": reason,
                         "initiated_by": "UI",
-                        "user_name": st.session_state.get('backup_user_name', 'Unknown'),
+                        "user_name": user_name_display,
                         "file_size": os.path.getsize(compressed_file) if os.path.exists(compressed_file) else 0
                     }
                 )
                 
                 st.success(f"✅ **Backup Created Successfully!**")
-                st.info(f"👤 **User:** {st.session_state.get('backup_user_name', 'Unknown')}")
-                st.info(f"📁 **File:** `{os.path.basename(compressed_file)}`")
-                st.info(f"📋 **Reason:** {reason}")
+                st.info(
+                    f"👤 **User:** {user_name_display}  \n"
+                    f"📁 **File:** `{os.path.basename(compressed_file)}`  \n"
+                    f"📋 **Reason:** {reason}"
+                )
                 
                 # Show file size
                 if os.path.exists(compressed_file):
@@ -186,27 +208,27 @@ def create_manual_backup(reason, logger):
                 logger.log_event(
                     event_type="MANUAL_BACKUP_ERROR",
                     description="Manual backup verification failed",
-                    user=st.session_state.get('username', 'hr_user'),
+                    user=username,
                     details={
                         "reason": reason, 
                         "error": "Verification failed",
-                        "user_name": st.session_state.get('backup_user_name', 'Unknown')
+                        "user_name": user_name_display
                     }
                 )
         else:
             progress_bar.progress(100)
             status_text.text("❌ Backup creation failed")
             st.error("❌ **Backup creation failed!** Please check the database connection and try again.")
-            st.error(f"Error details: {result.stderr}")
+            st.error(f"Error details: {dump_errors}")
             
             logger.log_event(
                 event_type="MANUAL_BACKUP_ERROR",
                 description="Manual backup creation failed",
-                user=st.session_state.get('username', 'hr_user'),
+                user=username,
                 details={
                     "reason": reason, 
-                    "error": result.stderr,
-                    "user_name": st.session_state.get('backup_user_name', 'Unknown')
+                    "error": dump_errors,
+                    "user_name": user_name_display
                 }
             )
             
@@ -218,11 +240,11 @@ def create_manual_backup(reason, logger):
         logger.log_event(
             event_type="MANUAL_BACKUP_ERROR",
             description=f"Manual backup failed with error: {str(e)}",
-            user=st.session_state.get('username', 'hr_user'),
+            user=username,
             details={
                 "reason": reason, 
                 "error": str(e),
-                "user_name": st.session_state.get('backup_user_name', 'Unknown')
+                "user_name": user_name_display
             }
         )
 
@@ -237,13 +259,14 @@ def verify_backup_file(backup_file):
         if file_size == 0:
             return False
         
-        # Test gzip integrity
-        test_cmd = ["gunzip", "-t", backup_file]
-        result = subprocess.run(test_cmd, capture_output=True)
+        # Test gzip integrity in-process; a bad CRC or truncated stream raises
+        with gzip.open(backup_file, 'rb') as f:
+            while f.read(1 << 20):
+                pass
         
-        return result.returncode == 0
+        return True
         
-    except Exception as e:
+    except (OSError, EOFError, zlib.error):
         return False
 
 def render_backup_history():
@@ -256,61 +279,65 @@ def render_backup_history():
         st.warning("No backup directory found.")
         return
     
-    # Get all backup files
-    backup_files = glob.glob(f"{backup_dir}/employee_db_backup_*.sql.gz")
+    # Get all backup files in one directory pass; DirEntry caches its stat()
+    with os.scandir(backup_dir) as it:
+        entries = [
+            e for e in it
+            if e.name.startswith("employee_db_backup_") and e.name.endswith(".sql.gz")
+        ]
     
-    if not backup_files:
+    if not entries:
         st.info("No backup files found.")
         return
     
-    # Sort by modification time (newest first)
-    backup_files.sort(key=os.path.getmtime, reverse=True)
+    # Only the history table needs pandas/numpy, so import them here
+    import numpy as np
+    import pandas as pd
+    
+    # Newest backups first; only the top of the list is shown, so skip a full sort
+    recent = heapq.nlargest(BACKUP_HISTORY_LIMIT, entries, key=lambda e: e.stat().st_mtime)
     
     # Try to get backup logs to match with files
     try:
-        from logs.activity_logger import get_logger
         logger = get_logger()
-        logs = logger.get_logs(event_type="MANUAL_BACKUP", limit=100)
+        with logger.engine.connect() as conn:
+            rows = conn.execute(_SQL_BACKUP_USERS).fetchall()
         
         # Create a mapping from backup filename to user
-        backup_to_user = {}
-        for _, log in logs.iterrows():
-            try:
-                if 'details' in log and log['details']:
-                    details = json.loads(log['details']) if isinstance(log['details'], str) else log['details']
-                    if 'backup_file' in details:
-                        backup_file = details['backup_file']
-                        user_name = details.get('user_name', log.get('user', 'Unknown'))
-                        backup_to_user[os.path.basename(backup_file)] = user_name
-            except:
-                pass
+        backup_to_user = {
+            os.path.basename(backup_file): user_name or 'Unknown'
+            for backup_file, user_name in rows if backup_file
+        }
     except Exception as e:
         backup_to_user = {}
         st.warning(f"Could not fetch user information for backups: {str(e)}")
     
     # Create backup history table
-    backup_data = []
-    for backup_file in backup_files:
-        file_name = os.path.basename(backup_file)
-        file_size = os.path.getsize(backup_file) / (1024 * 1024)  # MB
-        created_time = datetime.fromtimestamp(os.path.getmtime(backup_file))
-        age_days = (datetime.now() - created_time).days
+    names, created, users, sizes, ages, statuses = [], [], [], [], [], []
+    now = datetime.now()
+    for entry in recent:
+        file_stat = entry.stat()
+        created_time = datetime.fromtimestamp(file_stat.st_mtime)
+        age_days = (now - created_time).days
         
+        names.append(entry.name)
+        created.append(created_time.strftime("%Y-%m-%d %H:%M:%S"))
         # Try to get user who created this backup
-        created_by = backup_to_user.get(file_name, "Unknown")
-        
-        backup_data.append({
-            "File Name": file_name,
-            "Created": created_time.strftime("%Y-%m-%d %H:%M:%S"),
-            "Created By": created_by,
-            "Size (MB)": f"{file_size:.2f}",
-            "Age (Days)": age_days,
-            "Status": "✅ Valid" if age_days <= 30 else "⚠️ Old"
-        })
+        users.append(backup_to_user.get(entry.name, "Unknown"))
+        sizes.append(file_stat.st_size / (1024 * 1024))  # MB
+        ages.append(age_days)
+        statuses.append("✅ Valid" if age_days <= 30 else "⚠️ Old")
     
-    # Display as dataframe
-    if backup_data:
-        df = pd.DataFrame(backup_data)
+    # Display as dataframe, built column by column
+    if names:
+        df = pd.DataFrame({
+            "File Name": names,
+            "Created": created,
+            "Created By": users,
+            "Size (MB)": np.asarray(sizes, dtype=np.float64),
+            "Age (Days)": np.asarray(ages, dtype=np.int32),
+            "Status": statuses
+        })
         st.dataframe(
             df,
             hide_index=True,
@@ -319,23 +346,24 @@ def render_backup_history():
                 "File Name": st.column_config.TextColumn("File Name", width="large"),
                 "Created": "Created Date",
                 "Created By": "Created By",
-                "Size (MB)": "Size (MB)",
+                "Size (MB)": st.column_config.NumberColumn("Size (MB)", format="%.2f"),
                 "Age (Days)": "Age (Days)",
                 "Status": "Status"
             }
         )
+        if len(entries) > len(recent):
+            st.caption(f"Showing the {len(recent)} most recent of {len(entries)} backups.")
         
         # Summary stats
-        total_size = sum([os.path.getsize(f) for f in backup_files]) / (1024 * 1024)
+        total_size = sum(e.stat().st_size for e in entries) / (1024 * 1024)
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            st.metric("Total Backups", len(backup_files))
+            st.metric("Total Backups", len(entries))
         with col2:
             st.metric("Total Size", f"{total_size:.2f} MB")
         with col3:
-            latest_backup = max(backup_files, key=os.path.getmtime)
-            latest_age = (datetime.now() - datetime.fromtimestamp(os.path.getmtime(latest_backup))).days
+            latest_age = (datetime.now() - datetime.fromtimestamp(recent[0].stat().st_mtime)).days
             st.metric("Latest Backup Age", f"{latest_age} days")
 
 def render_backup_settings():
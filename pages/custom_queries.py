@@ -1,7 +1,354 @@
 import streamlit as st
 import pandas as pd
+import io
+import re
+import time
+from collections import OrderedDict
+import pyarrow as pa
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
 from logs.activity_logger import get_logger
 
+# Seconds the report filter options are shared before re-reading them
+FILTER_OPTIONS_TTL = 900
+
+# Rows fetched per round trip from the server-side cursor
+REPORT_CHUNK_SIZE = 50_000
+
+# Rows shown on screen; the CSV download always has the full report
+REPORT_PREVIEW_ROWS = 1000
+
+# Report results kept per session, and for how many seconds
+REPORT_CACHE_SIZE = 8
+REPORT_CACHE_TTL = 300
+
+@st.cache_data(ttl=FILTER_OPTIONS_TTL, show_spinner=False)
+def query_filter_options(_engine):
+    """Get the employee, department and project names offered as report filters"""
+    # Get list of employee names with null handling
+    employee_query = """
+        SELECT DISTINCT employee_name 
+        FROM employee 
+        WHERE employee_name IS NOT NULL AND employee_name != ''
+        ORDER BY employee_name
+    """
+
+    # Get list of departments with null handling
+    dept_query = """
+        SELECT DISTINCT d.department_name 
+        FROM department d
+        JOIN employee e ON e.department_id = d.department_id
+        WHERE d.department_name IS NOT NULL AND d.department_name != ''
+        ORDER BY d.department_name
+    """
+
+    # Get list of projects with null handling
+    proj_query = """
+        SELECT DISTINCT project_name 
+        FROM project 
+        WHERE project_name IS NOT NULL AND project_name != ''
+        ORDER BY project_name
+    """
+
+    lookups = [employee_query, dept_query, proj_query]
+
+    def fetch_names(query):
+        with _engine.connect() as conn:
+            return conn.exec_driver_sql(query).scalars().all()
+
+    # The lookups are independent, so run them on separate pooled connections at once
+    with ThreadPoolExecutor(max_workers=len(lookups)) as executor:
+        employee_names, departments, projects = executor.map(fetch_names, lookups)
+
+    return employee_names, departments, projects
+
+
+def get_filter_options(engine):
+    """Cached report filter options, reporting a failed lookup on the page"""
+    # Errors are raised rather than returned by the cached query, so they are never cached
+    try:
+        return query_filter_options(engine)
+    except Exception as e:
+        st.error(f"Error loading filter options: {e}")
+        
+        # Log error
+        get_logger().log_event(
+            event_type="ERROR",
+            description=f"Error loading filter options: {str(e)}",
+            user=st.session_state.get('username', 'unknown')
+        )
+        
+        return [], [], []
+
+
+# Employee status buckets, matched on UPPER(status) so ix_employee_status_upper applies
+STATUS_ACTIVE_PRED = "(e.status IS NULL OR UPPER(e.status) IN ('ACTIVE', 'A'))"
+STATUS_INACTIVE_PRED = "UPPER(e.status) IN ('INACTIVE', 'I', 'TERMINATED', 'RESIGNED', 'DISABLED')"
+STATUS_FILTER = f"""(:employee_status = 'All'
+         OR (:employee_status = 'Active' AND {STATUS_ACTIVE_PRED})
+         OR (:employee_status = 'Inactive' AND {STATUS_INACTIVE_PRED}))"""
+
+# Report queries are parsed once and keep one shape for every filter combination:
+# lists bind as a single array, and "All" switches a filter off through its *_all flag
+
+EMPLOYEE_DETAILS_SQL = text(f"""
+    SELECT 
+        e.employee_code,
+        e.employee_name,
+        d.department_name as department,
+        des.designation_name as designation,
+        e.email,
+        e.date_of_joining,
+        e.employee_type,
+        e.grade,
+        e.status,
+        e.current_experience,
+        e.past_experience,
+        e.total_experience
+    FROM employee e
+    LEFT JOIN department d ON e.department_id = d.department_id
+    LEFT JOIN designation des ON e.designation_id = des.designation_id
+    WHERE 1=1
+    AND {STATUS_FILTER}
+    AND (:employees_all OR e.employee_name = ANY(:employees))
+    AND (:departments_all OR d.department_name = ANY(:departments))
+""")
+
+PROJECT_ASSIGNMENTS_SQL = text(f"""
+    SELECT 
+        t.work_date as date,
+        t.employee_code,
+        e.employee_name,
+        d.department_name as department,
+        p.project_id,
+        p.project_name,
+        t.hours_worked
+    FROM timesheet t
+    JOIN employee e ON t.employee_code = e.employee_code
+    LEFT JOIN department d ON e.department_id = d.department_id
+    JOIN project p ON t.project_id = p.project_id
+    WHERE 1=1
+    AND (:start_date IS NULL OR t.work_date >= :start_date)
+    AND (:end_date IS NULL OR t.work_date <= :end_date)
+    AND (:projects_all OR p.project_name = ANY(:projects))
+    AND {STATUS_FILTER}
+    AND (:employees_all OR e.employee_name = ANY(:employees))
+    AND (:departments_all OR d.department_name = ANY(:departments))
+    ORDER BY t.work_date, e.employee_name
+""")
+
+ATTENDANCE_RECORDS_SQL = text(f"""
+    SELECT 
+        a.attendance_date as date,
+        a.employee_code, 
+        e.employee_name,
+        d.department_name as department,
+        a.clock_in_time,
+        a.clock_out_time,
+        a.total_hours,
+        a.attendance_type
+    FROM attendance a
+    JOIN employee e ON a.employee_code = e.employee_code
+    LEFT JOIN department d ON e.department_id = d.department_id
+    WHERE 1=1
+    AND (:start_date IS NULL OR a.attendance_date >= :start_date)
+    AND (:end_date IS NULL OR a.attendance_date <= :end_date)
+    AND {STATUS_FILTER}
+    AND (:employees_all OR e.employee_name = ANY(:employees))
+    AND (:departments_all OR d.department_name = ANY(:departments))
+    ORDER BY a.attendance_date, e.employee_name
+""")
+
+TIMESHEET_SUMMARY_SQL = text(f"""
+    SELECT 
+        e.employee_code,
+        e.employee_name,
+        d.department_name as department,
+        p.project_id,
+        p.project_name,
+        (SUM(t.hours_centi) / 100.0)::numeric(12,2) as total_hours,
+        COUNT(DISTINCT t.work_date) as days_worked,
+        MIN(t.work_date) as first_day,
+        MAX(t.work_date) as last_day
+    FROM timesheet t
+    JOIN employee e ON t.employee_code = e.employee_code
+    LEFT JOIN department d ON e.department_id = d.department_id
+    JOIN project p ON t.project_id = p.project_id
+    WHERE 1=1
+    AND (:start_date IS NULL OR t.work_date >= :start_date)
+    AND (:end_date IS NULL OR t.work_date <= :end_date)
+    AND (:projects_all OR p.project_name = ANY(:projects))
+    AND {STATUS_FILTER}
+    AND (:employees_all OR e.employee_name = ANY(:employees))
+    AND (:departments_all OR d.department_name = ANY(:departments))
+    GROUP BY e.employee_code, e.employee_name, d.department_name, p.project_id, p.project_name
+    ORDER BY e.employee_name, p.project_name
+""")
+
+# Timesheet Summary without a date range reads the rollup kept by the ETL upload
+TIMESHEET_SUMMARY_ROLLUP_SQL = text(f"""
+    SELECT 
+        e.employee_code,
+        e.employee_name,
+        d.department_name as department,
+        p.project_id,
+        p.project_name,
+        ts.total_hours,
+        ts.days_worked,
+        ts.first_day,
+        ts.last_day
+    FROM mv_timesheet_summary ts
+    JOIN employee e ON ts.employee_code = e.employee_code
+    LEFT JOIN department d ON e.department_id = d.department_id
+    JOIN project p ON ts.project_id = p.project_id
+    WHERE 1=1
+    AND (:projects_all OR p.project_name = ANY(:projects))
+    AND {STATUS_FILTER}
+    AND (:employees_all OR e.employee_name = ANY(:employees))
+    AND (:departments_all OR d.department_name = ANY(:departments))
+    ORDER BY e.employee_name, p.project_name
+""")
+
+REPORT_QUERIES = {
+    "Employee Details": EMPLOYEE_DETAILS_SQL,
+    "Project Assignments": PROJECT_ASSIGNMENTS_SQL,
+    "Attendance Records": ATTENDANCE_RECORDS_SQL,
+    "Timesheet Summary": TIMESHEET_SUMMARY_SQL,
+}
+
+
+def with_row_limit(query):
+    """Copy of a report query that stops after :row_limit rows"""
+    return text(query.text + "    LIMIT :row_limit\n")
+
+
+REPORT_PREVIEWS = {name: with_row_limit(query) for name, query in REPORT_QUERIES.items()}
+TIMESHEET_SUMMARY_ROLLUP_PREVIEW = with_row_limit(TIMESHEET_SUMMARY_ROLLUP_SQL)
+
+
+def build_filters(employees, departments, projects, employee_status, start_date, end_date):
+    """Bind parameters shared by every report query for the chosen filters"""
+    params = {
+        "employee_status": employee_status,
+        "start_date": start_date,
+        "end_date": end_date,
+        # One extra row tells us the preview was cut short
+        "row_limit": REPORT_PREVIEW_ROWS + 1,
+    }
+    for name, selected in (("employees", employees), ("departments", departments), ("projects", projects)):
+        # An empty selection means no filter, same as "All"
+        params[f"{name}_all"] = "All" in selected or not selected
+        params[name] = list(selected)
+    return params
+
+
+def read_report(conn, query, params):
+    """Run a report query over a server-side cursor, fetching it in chunks"""
+    streaming = conn.execution_options(stream_results=True)
+    chunks = list(pd.read_sql(query, streaming, params=params, chunksize=REPORT_CHUNK_SIZE))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True, copy=False)
+
+
+def copy_report_csv(conn, query, params):
+    """Have Postgres encode the full report as CSV with COPY ... TO STDOUT"""
+    # psycopg2 pyformat placeholders; it renders lists as ARRAY[...] literals
+    sql = re.sub(r"(?<!:):(\w+)", r"%(\1)s", query.text)
+
+    cursor = conn.connection.cursor()
+    try:
+        select = cursor.mogrify(sql, params).decode()
+        buf = io.BytesIO()
+        cursor.copy_expert(f"COPY ({select}) TO STDOUT WITH CSV HEADER", buf)
+        return buf.getvalue()
+    finally:
+        cursor.close()
+
+
+def run_report(engine, report_type, params):
+    """Fetch a report's preview as an Arrow table"""
+    query = REPORT_QUERIES[report_type]
+    preview = REPORT_PREVIEWS[report_type]
+
+    # The rollup attempt and its fallback share one pooled connection
+    with engine.connect() as conn:
+        if report_type == "Timesheet Summary" and params["start_date"] is None and params["end_date"] is None:
+            try:
+                df = read_report(conn, TIMESHEET_SUMMARY_ROLLUP_PREVIEW, params)
+                query = TIMESHEET_SUMMARY_ROLLUP_SQL
+            except ProgrammingError:
+                # Rollup not created on this database yet; aggregate live
+                df = read_report(conn, preview, params)
+        else:
+            df = read_report(conn, preview, params)
+
+    truncated = len(df) > REPORT_PREVIEW_ROWS
+    # Streamlit ships Arrow to the browser, so keep the preview as an Arrow table
+    table = pa.Table.from_pandas(df.iloc[:REPORT_PREVIEW_ROWS], preserve_index=False)
+    return query, table, truncated
+
+
+def get_cached_report(engine, report_type, params, cache_key):
+    """Get a report result, reusing this session's recent runs of the same filters"""
+    cache = st.session_state.setdefault("report_cache", OrderedDict())
+
+    cached = cache.get(cache_key)
+    if cached and time.monotonic() - cached[-1] < REPORT_CACHE_TTL:
+        cache.move_to_end(cache_key)
+        return cached[:-1]
+
+    result = run_report(engine, report_type, params)
+    cache[cache_key] = (*result, time.monotonic())
+    cache.move_to_end(cache_key)
+    # Keep only the most recently used results
+    while len(cache) > REPORT_CACHE_SIZE:
+        cache.popitem(last=False)
+    return result
+
+
+def prepare_report_csv(engine):
+    """Download-button callback: export the last generated report in full"""
+    pending = st.session_state.get("pending_full_query")
+    if not pending:
+        return
+    _, query, params = pending
+    try:
+        with engine.connect() as conn:
+            st.session_state["report_csv"] = copy_report_csv(conn, query, params)
+    except Exception as e:
+        st.error(f"Error exporting report: {e}")
+
+
+def render_report_view(engine):
+    """Show the last generated report and its CSV export"""
+    view = st.session_state.get("report_view")
+    if not view:
+        return
+    report_type, table, truncated = view
+
+    if table.num_rows:
+        st.subheader(f"{report_type} Report")
+        st.dataframe(table, use_container_width=True)
+        if truncated:
+            st.caption(f"Showing the first {REPORT_PREVIEW_ROWS:,} rows. Download the CSV for the full report.")
+
+        # The full report is only exported when asked for
+        csv = st.session_state.get("report_csv")
+        if csv is None:
+            st.button("Prepare CSV", key="prepare_report_csv", on_click=prepare_report_csv, args=(engine,))
+        else:
+            st.download_button(
+                label="Download CSV",
+                data=csv,
+                file_name=f"{report_type.lower().replace(' ', '_')}_report.csv",
+                mime="text/csv",
+            )
+    else:
+        st.info("No data found matching your criteria")
+
+
 def render_custom_queries(engine):
     """Render the custom queries interface"""
     st.header("Custom Query Builder")
@@ -9,56 +356,7 @@ def render_custom_queries(engine):
     # Get activity logger
     activity_logger = get_logger(engine)
 
-    # Cache the filter options to avoid repeated queries
-    @st.cache_data
-    def get_filter_options():
-        try:
-            # Get list of employee names with null handling
-            employee_query = """
-                SELECT DISTINCT employee_name 
-                FROM employee 
-                WHERE employee_name IS NOT NULL AND employee_name != ''
-                ORDER BY employee_name
-            """
-            employee_names_df = pd.read_sql(employee_query, engine)
-            employee_names = employee_names_df["employee_name"].tolist()
-
-            # Get list of departments with null handling
-            dept_query = """
-                SELECT DISTINCT d.department_name 
-                FROM department d
-                JOIN employee e ON e.department_id = d.department_id
-                WHERE d.department_name IS NOT NULL AND d.department_name != ''
-                ORDER BY d.department_name
-            """
-            departments_df = pd.read_sql(dept_query, engine)
-            departments = departments_df["department_name"].tolist()
-
-            # Get list of projects with null handling
-            proj_query = """
-                SELECT DISTINCT project_name 
-                FROM project 
-                WHERE project_name IS NOT NULL AND project_name != ''
-                ORDER BY project_name
-            """
-            projects_df = pd.read_sql(proj_query, engine)
-            projects = projects_df["project_name"].tolist()
-
-            return employee_names, departments, projects
-
-        except Exception as e:
-            st.error(f"Error loading filter options: {e}")
-            
-            # Log error
-            activity_logger.log_event(
-                event_type="ERROR",
-                description=f"Error loading filter options: {str(e)}",
-                user=st.session_state.get('username', 'unknown')
-            )
-            
-            return [], [], []
-
-    employee_names, departments, projects = get_filter_options()
+    employee_names, departments, projects = get_filter_options(engine)
 
     # Create filter columns
     col1, col2, col3 = st.columns(3)
@@ -90,196 +388,23 @@ def render_custom_queries(engine):
     # Build the query
     if st.button("Generate Report", key="custom_query_report"):
         try:
-            df = pd.DataFrame()  # Initialize empty dataframe
-            query = ""  # Initialize query string
-            params = []  # Initialize params list
-
-            if report_type == "Employee Details":
-                query = """
-                    SELECT 
-                        e.employee_code,
-                        e.employee_name,
-                        d.department_name as department,
-                        des.designation_name as designation,
-                        e.email,
-                        e.date_of_joining,
-                        e.employee_type,
-                        e.grade,
-                        e.status,
-                        e.current_experience,
-                        e.past_experience,
-                        e.total_experience
-                    FROM employee e
-                    LEFT JOIN department d ON e.department_id = d.department_id
-                    LEFT JOIN designation des ON e.designation_id = des.designation_id
-                    WHERE 1=1
-                """
-
-                # Add employee status filter
-                if employee_status == "Active":
-                    query += " AND (e.status = 'Active' OR e.status IS NULL OR UPPER(e.status) IN ('ACTIVE', 'A'))"
-                elif employee_status == "Inactive":
-                    query += " AND (e.status IS NOT NULL AND UPPER(e.status) IN ('INACTIVE', 'I', 'TERMINATED', 'RESIGNED', 'DISABLED'))"
-
-                if "All" not in selected_employees and selected_employees:
-                    placeholders = ",".join(["%s" for _ in selected_employees])
-                    query += f" AND e.employee_name IN ({placeholders})"
-                    params.extend(selected_employees)
-
-                if "All" not in selected_departments and selected_departments:
-                    placeholders = ",".join(["%s" for _ in selected_departments])
-                    query += f" AND d.department_name IN ({placeholders})"
-                    params.extend(selected_departments)
-
-                df = pd.read_sql(query, engine, params=tuple(params))
-
-            elif report_type == "Project Assignments":
-                query = """
-                    SELECT 
-                        t.work_date as date,
-                        t.employee_code,
-                        e.employee_name,
-                        d.department_name as department,
-                        p.project_id,
-                        p.project_name,
-                        t.hours_worked
-                    FROM timesheet t
-                    JOIN employee e ON t.employee_code = e.employee_code
-                    LEFT JOIN department d ON e.department_id = d.department_id
-                    JOIN project p ON t.project_id = p.project_id
-                    WHERE 1=1
-                """
-
-                # Add employee status filter
-                if employee_status == "Active":
-                    query += " AND (e.status = 'Active' OR e.status IS NULL OR UPPER(e.status) IN ('ACTIVE', 'A'))"
-                elif employee_status == "Inactive":
-                    query += " AND (e.status IS NOT NULL AND UPPER(e.status) IN ('INACTIVE', 'I', 'TERMINATED', 'RESIGNED', 'DISABLED'))"
-
-                if "All" not in selected_employees and selected_employees:
-                    placeholders = ",".join(["%s" for _ in selected_employees])
-                    query += f" AND e.employee_name IN ({placeholders})"
-                    params.extend(selected_employees)
-
-                if "All" not in selected_departments and selected_departments:
-                    placeholders = ",".join(["%s" for _ in selected_departments])
-                    query += f" AND d.department_name IN ({placeholders})"
-                    params.extend(selected_departments)
-
-                if "All" not in selected_projects and selected_projects:
-                    placeholders = ",".join(["%s" for _ in selected_projects])
-                    query += f" AND p.project_name IN ({placeholders})"
-                    params.extend(selected_projects)
-
-                if start_date:
-                    query += " AND t.work_date >= %s"
-                    params.append(start_date.strftime('%Y-%m-%d'))
-
-                if end_date:
-                    query += " AND t.work_date <= %s"
-                    params.append(end_date.strftime('%Y-%m-%d'))
-
-                query += " ORDER BY t.work_date, e.employee_name"
-
-                df = pd.read_sql(query, engine, params=tuple(params))
-
-            elif report_type == "Attendance Records":
-                query = """
-                    SELECT 
-                        a.attendance_date as date,
-                        a.employee_code, 
-                        e.employee_name,
-                        d.department_name as department,
-                        a.clock_in_time,
-                        a.clock_out_time,
-                        a.total_hours,
-                        a.attendance_type
-                    FROM attendance a
-                    JOIN employee e ON a.employee_code = e.employee_code
-                    LEFT JOIN department d ON e.department_id = d.department_id
-                    WHERE 1=1
-                """
-
-                # Add employee status filter
-                if employee_status == "Active":
-                    query += " AND (e.status = 'Active' OR e.status IS NULL OR UPPER(e.status) IN ('ACTIVE', 'A'))"
-                elif employee_status == "Inactive":
-                    query += " AND (e.status IS NOT NULL AND UPPER(e.status) IN ('INACTIVE', 'I', 'TERMINATED', 'RESIGNED', 'DISABLED'))"
-
-                if "All" not in selected_employees and selected_employees:
-                    placeholders = ",".join(["%s" for _ in selected_employees])
-                    query += f" AND e.employee_name IN ({placeholders})"
-                    params.extend(selected_employees)
-
-                if "All" not in selected_departments and selected_departments:
-                    placeholders = ",".join(["%s" for _ in selected_departments])
-                    query += f" AND d.department_name IN ({placeholders})"
-                    params.extend(selected_departments)
-
-                if start_date:
-                    query += " AND a.attendance_date >= %s"
-                    params.append(start_date.strftime('%Y-%m-%d'))
-
-                if end_date:
-                    query += " AND a.attendance_date <= %s"
-                    params.append(end_date.strftime('%Y-%m-%d'))
-
-                query += " ORDER BY a.attendance_date, e.employee_name"
-
-                df = pd.read_sql(query, engine, params=tuple(params))
-
-            elif report_type == "Timesheet Summary":
-                query = """
-                    SELECT 
-                        e.employee_code,
-                        e.employee_name,
-                        d.department_name as department,
-                        p.project_id,
-                        p.project_name,
-                        SUM(t.hours_worked) as total_hours,
-                        COUNT(DISTINCT t.work_date) as days_worked,
-                        MIN(t.work_date) as first_day,
-                        MAX(t.work_date) as last_day
-                    FROM timesheet t
-                    JOIN employee e ON t.employee_code = e.employee_code
-                    LEFT JOIN department d ON e.department_id = d.department_id
-                    JOIN project p ON t.project_id = p.project_id
-                    WHERE 1=1
-                """
-
-                # Add employee status filter
-                if employee_status == "Active":
-                    query += " AND (e.status = 'Active' OR e.status IS NULL OR UPPER(e.status) IN ('ACTIVE', 'A'))"
-                elif employee_status == "Inactive":
-                    query += " AND (e.status IS NOT NULL AND UPPER(e.status) IN ('INACTIVE', 'I', 'TERMINATED', 'RESIGNED', 'DISABLED'))"
-
-                if "All" not in selected_employees and selected_employees:
-                    placeholders = ",".join(["%s" for _ in selected_employees])
-                    query += f" AND e.employee_name IN ({placeholders})"
-                    params.extend(selected_employees)
-
-                if "All" not in selected_departments and selected_departments:
-                    placeholders = ",".join(["%s" for _ in selected_departments])
-                    query += f" AND d.department_name IN ({placeholders})"
-                    params.extend(selected_departments)
-
-                if "All" not in selected_projects and selected_projects:
-                    placeholders = ",".join(["%s" for _ in selected_projects])
-                    query += f" AND p.project_name IN ({placeholders})"
-                    params.extend(selected_projects)
-
-                if start_date:
-                    query += " AND t.work_date >= %s"
-                    params.append(start_date.strftime('%Y-%m-%d'))
-
-                if end_date:
-                    query += " AND t.work_date <= %s"
-                    params.append(end_date.strftime('%Y-%m-%d'))
-
-                query += " GROUP BY e.employee_code, e.employee_name, d.department_name, p.project_id, p.project_name"
-                query += " ORDER BY e.employee_name, p.project_name"
-
-                df = pd.read_sql(query, engine, params=tuple(params))
+            params = build_filters(
+                selected_employees, selected_departments, selected_projects,
+                employee_status, start_date, end_date
+            )
+
+            # Repeat runs of the same filters are served from the session cache
+            cache_key = (
+                report_type,
+                tuple(sorted(selected_employees)),
+                tuple(sorted(selected_departments)),
+                tuple(sorted(selected_projects)),
+                start_date, end_date, employee_status
+            )
+            query, table, truncated = get_cached_report(engine, report_type, params, cache_key)
+            st.session_state["report_view"] = (report_type, table, truncated)
+            st.session_state["pending_full_query"] = (report_type, query, params)
+            st.session_state.pop("report_csv", None)
 
             # Log the query
             query_details = {
@@ -296,28 +421,13 @@ def render_custom_queries(engine):
             
             # Log the query execution
             activity_logger.log_query(
-                query_text=query,
+                query_text=str(query),
                 user=st.session_state.get('username', 'unknown'),
                 query_type="CUSTOM",
                 status="SUCCESS"
             )
 
-            # Display results
-            if not df.empty:
-                st.subheader(f"{report_type} Report")
-                st.dataframe(df, use_container_width=True)
-                
-                # Add download button
-                csv = df.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    label="Download CSV",
-                    data=csv,
-                    file_name=f"{report_type.lower().replace(' ', '_')}_report.csv",
-                    mime="text/csv",
-                )
-            else:
-                st.info("No data found matching your criteria")
-                
+            if not table.num_rows:
                 # Log empty result
                 activity_logger.log_event(
                     event_type="QUERY_RESULT",
@@ -328,6 +438,7 @@ def render_custom_queries(engine):
 
         except Exception as e:
             st.error(f"Error executing query: {e}")
+            st.session_state.pop("report_view", None)
             
             # Log error
             activity_logger.log_event(
@@ -335,4 +446,6 @@ def render_custom_queries(engine):
                 description=f"Custom query error: {str(e)}",
                 user=st.session_state.get('username', 'unknown'),
                 details={"report_type": report_type}
-            )
\ No newline at end of file
+            )
+
+    render_report_view(engine)
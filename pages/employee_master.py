@@ -4,6 +4,9 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, date
 import io
+import csv
+import itertools
+import hashlib
 import numpy as np
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
@@ -12,21 +15,38 @@ from reportlab.lib.units import inch
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 import base64
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
-def show_employee_master_report(engine=None, db_pool=None):
+logger = logging.getLogger(__name__)
+
+# reportlab 4 ships its C speedups in the separate rl_accel package and silently
+# falls back to pure Python without it, which makes PDF generation noticeably slower
+try:
+    import _rl_accel  # noqa: F401
+except ImportError:
+    logger.warning("reportlab C accelerator (rl_accel) not installed; PDF reports will be slower")
+
+# Employee lookups are re-read at most this often; repeat selections are served from cache
+EMPLOYEE_CACHE_TTL = 300
+
+# Employees either side of the selection whose profiles are loaded in the background
+EMPLOYEE_PREFETCH_RADIUS = 1
+
+def show_employee_master_report(engine):
     """Display Employee Master Report with comprehensive employee and project details"""
     st.subheader("Employee Master Report")
     
-    # Initialize session state
+    # Initialize session state; only the code is kept, the data comes from the cached loader
     if 'selected_employee' not in st.session_state:
         st.session_state.selected_employee = None
-    if 'employee_data' not in st.session_state:
-        st.session_state.employee_data = None
-    if 'project_data' not in st.session_state:
-        st.session_state.project_data = None
+    employee_details = project_details = None
     
     # Load employee data - show all active employees by default
-    employees_df = load_employee_data(engine, db_pool, "Active", "All", "All")
+    employees_df = load_employee_data(engine, "Active", "All", "All",
+                                      columns=('employee_code', 'employee_name'))
     
     if employees_df.empty:
         st.warning("No employees found matching the selected criteria.")
@@ -39,38 +59,37 @@ def show_employee_master_report(engine=None, db_pool=None):
         # st.subheader("Employee List")
         
         # Employee selection
-        employee_options = [f"{row['employee_code']} - {row['employee_name']}" 
-                          for _, row in employees_df.iterrows()]
+        # The widget keeps the stable employee code; the label is only for display
+        name_by_code = dict(zip(employees_df['employee_code'], employees_df['employee_name']))
         
-        selected_employee_option = st.selectbox(
+        selected_employee_code = st.selectbox(
             "Select Employee:",
-            employee_options,
+            options=list(name_by_code),
+            format_func=lambda code: f"{code} - {name_by_code[code]}",
             key="employee_selector"
         )
         
-        if selected_employee_option:
-            selected_employee_code = selected_employee_option.split(" - ")[0]
-            
-            # Load detailed employee data
-            employee_details = load_employee_details(engine, db_pool, selected_employee_code)
-            project_details = load_employee_projects(engine, db_pool, selected_employee_code)
+        if selected_employee_code:
+            # Load detailed employee and project data together
+            await_prefetch(selected_employee_code)
+            employee_details, project_details = load_employee_profile(engine, selected_employee_code)
             
             # Debug information
             if employee_details is None:
                 st.error("Failed to load employee details. Please check the database connection.")
             else:
+                if st.session_state.selected_employee != selected_employee_code:
+                    prefetch_neighbours(engine, list(name_by_code), selected_employee_code)
                 st.session_state.selected_employee = selected_employee_code
-                st.session_state.employee_data = employee_details
-                st.session_state.project_data = project_details
     
     with col2:
-        if st.session_state.employee_data is not None:
-            display_employee_dashboard(st.session_state.employee_data, st.session_state.project_data)
+        if employee_details is not None:
+            display_employee_dashboard(employee_details, project_details)
         else:
             st.info("👈 Please select an employee from the list to view details.")
     
     # Download section
-    if st.session_state.employee_data is not None:
+    if employee_details is not None:
         st.markdown("---")
         st.subheader("Download Report")
         
@@ -78,66 +97,108 @@ def show_employee_master_report(engine=None, db_pool=None):
         
         
         with col2:
-            if st.button(" Download PDF Report", use_container_width=True):
-                pdf_buffer = generate_pdf_report(st.session_state.employee_data, st.session_state.project_data)
-                st.download_button(
-                    label="Download PDF File",
-                    data=pdf_buffer,
-                    file_name=f"Employee_Report_{st.session_state.selected_employee}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                    mime="application/pdf"
-                )
+            render_report_download(engine, 'pdf', "PDF", "application/pdf")
         
         with col3:
-            if st.button("Download CSV Report", use_container_width=True):
-                csv_buffer = generate_csv_report(st.session_state.employee_data, st.session_state.project_data)
-                st.download_button(
-                    label="Download CSV File",
-                    data=csv_buffer,
-                    file_name=f"Employee_Report_{st.session_state.selected_employee}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv"
-                )
-
-def get_departments(engine, db_pool):
+            render_report_download(engine, 'csv', "CSV", "text/csv")
+
+def report_payload_hash(employee_data, project_data):
+    """Cheap fingerprint of the data a report is built from"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(pd.util.hash_pandas_object(employee_data).values.tobytes())
+    digest.update(pd.util.hash_pandas_object(project_data).values.tobytes())
+    return digest.hexdigest()
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_report_bytes(kind, employee_code, payload_hash, _employee_data, _project_data):
+    """Build a PDF or CSV once per employee and data version"""
+    generate = generate_pdf_report if kind == 'pdf' else generate_csv_report
+    return generate(_employee_data, _project_data)
+
+def prepare_employee_report(engine, kind):
+    """Download-button callback: build the PDF or CSV for the selected employee"""
+    employee_code = st.session_state.selected_employee
+    employee_data, project_data = load_employee_profile(engine, employee_code)
+    if employee_data is None:
+        return
+    st.session_state[f"employee_report_{kind}"] = (
+        employee_code,
+        cached_report_bytes(kind, employee_code, report_payload_hash(employee_data, project_data),
+                            employee_data, project_data)
+    )
+
+def render_report_download(engine, kind, label, mime):
+    """Offer a report for download, building it only when asked for"""
+    employee_code = st.session_state.selected_employee
+    prepared = st.session_state.get(f"employee_report_{kind}")
+    # The callback runs before the rerun, so the download button shows up straight away
+    if prepared is None or prepared[0] != employee_code:
+        st.button(f"Prepare {label} Report", key=f"prepare_employee_{kind}", use_container_width=True,
+                  on_click=prepare_employee_report, args=(engine, kind))
+    else:
+        st.download_button(
+            label=f"Download {label} File",
+            data=prepared[1],
+            file_name=f"Employee_Report_{employee_code}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{kind}",
+            mime=mime,
+            use_container_width=True
+        )
+
+def get_departments(engine):
     """Get list of departments"""
     query = "SELECT DISTINCT department_name FROM department WHERE status = 'Active' ORDER BY department_name"
     try:
-        if engine:
-            df = pd.read_sql(query, engine)
-        else:
-            df = pd.read_sql(query, db_pool)
+        df = pd.read_sql(query, engine)
         return df['department_name'].tolist()
     except Exception as e:
         st.error(f"Error loading departments: {e}")
         return []
 
-def get_business_units(engine, db_pool):
+def get_business_units(engine):
     """Get list of business units"""
     query = "SELECT DISTINCT business_unit FROM department ORDER BY business_unit"
     try:
-        if engine:
-            df = pd.read_sql(query, engine)
-        else:
-            df = pd.read_sql(query, db_pool)
+        df = pd.read_sql(query, engine)
         return df['business_unit'].tolist()
     except Exception as e:
         st.error(f"Error loading business units: {e}")
         return []
 
-def load_employee_data(engine, db_pool, status_filter, dept_filter, bu_filter):
-    """Load employee data with filters"""
-    query = """
+# Positional placeholder token for each DB-API paramstyle; queries are written with %s
+PLACEHOLDERS = {'qmark': '?', 'format': '%s', 'pyformat': '%s'}
+
+def placeholder_for(engine):
+    """Return the positional placeholder the engine's driver expects"""
+    paramstyle = engine.dialect.paramstyle
+    return PLACEHOLDERS.get(paramstyle, '%s')
+
+# Select-list expressions for query_employee_data, by output column
+EMPLOYEE_LIST_COLUMNS = {
+    'employee_code': "e.employee_code",
+    'employee_name': "e.employee_name",
+    'email': "e.email",
+    'date_of_joining': "e.date_of_joining",
+    'employee_type': "e.employee_type",
+    'grade': "e.grade",
+    'status': "e.status",
+    'department_name': "d.department_name",
+    'business_unit': "d.business_unit",
+    'designation_name': "des.designation_name",
+    'current_status': "CASE WHEN ee.employee_code IS NOT NULL THEN 'Inactive' ELSE e.status END",
+}
+
+# Rows per fetch when streaming the employee list from a server-side cursor
+EMPLOYEE_CHUNK_SIZE = 10_000
+
+@st.cache_data(ttl=EMPLOYEE_CACHE_TTL, show_spinner=False)
+def query_employee_data(_engine, status_filter, dept_filter, bu_filter, columns=None):
+    """Load employee data with filters, optionally only the given columns"""
+    select_list = ",\n        ".join(
+        f"{EMPLOYEE_LIST_COLUMNS[col]} as {col}" for col in (columns or EMPLOYEE_LIST_COLUMNS)
+    )
+    query = f"""
     SELECT 
-        e.employee_code,
-        e.employee_name,
-        e.email,
-        e.date_of_joining,
-        e.employee_type,
-        e.grade,
-        e.status,
-        d.department_name,
-        d.business_unit,
-        des.designation_name,
-        CASE WHEN ee.employee_code IS NOT NULL THEN 'Inactive' ELSE e.status END as current_status
+        {select_list}
     FROM employee e
     LEFT JOIN department d ON e.department_id = d.department_id
     LEFT JOIN designation des ON e.designation_id = des.designation_id
@@ -162,257 +223,211 @@ def load_employee_data(engine, db_pool, status_filter, dept_filter, bu_filter):
     
     query += " ORDER BY e.employee_name"
     
-    try:
-        if engine:
-            if params:
-                df = pd.read_sql(query, engine, params=tuple(params))
-            else:
-                df = pd.read_sql(query, engine)
-        else:
-            if params:
-                if hasattr(db_pool, 'execute'):
-                    df = pd.read_sql(query, db_pool, params=tuple(params))
-                else:
-                    df = pd.read_sql(query, db_pool, params=params)
-            else:
-                df = pd.read_sql(query, db_pool)
-        return df
-    except Exception as e:
-        # Try alternative parameter method
-        try:
-            if params:
-                query_alt = query.replace('%s', '?')
-                if engine:
-                    df = pd.read_sql(query_alt, engine, params=params)
-                else:
-                    df = pd.read_sql(query_alt, db_pool, params=params)
-            else:
-                df = pd.read_sql(query, engine if engine else db_pool)
-            return df
-        except Exception as e2:
-            st.error(f"Error loading employee data: {e}")
-            st.error(f"Alternative method also failed: {e2}")
-            return pd.DataFrame()
-
-def load_employee_details(engine, db_pool, employee_code):
-    """Load detailed employee information"""
-    query = """
-    SELECT 
-        e.*,
-        d.department_name,
-        d.business_unit,
-        des.designation_name,
-        des.level as designation_level,
-        ep.gender,
-        ep.date_of_birth,
-        ep.marital_status,
-        ep.present_address,
-        ep.permanent_address,
-        ep.pan_number,
-        ep.aadhaar_number,
-        ef.bank_name,
-        ef.account_number,
-        ef.ifsc_code,
-        mgr.employee_name as manager_name,
-        ee.exit_date,
-        ee.last_working_date,
-        ee.exit_reason,
-        ee.exit_comments
-    FROM employee e
-    LEFT JOIN department d ON e.department_id = d.department_id
-    LEFT JOIN designation des ON e.designation_id = des.designation_id
-    LEFT JOIN employee_personal ep ON e.employee_code = ep.employee_code
-    LEFT JOIN employee_financial ef ON e.employee_code = ef.employee_code
-    LEFT JOIN employee mgr ON e.primary_manager_id = mgr.employee_code
-    LEFT JOIN employee_exit ee ON e.employee_code = ee.employee_code
-    WHERE e.employee_code = %s
-    """
+    query = query.replace('%s', placeholder_for(_engine))
+    
+    # Server-side cursor so only one chunk of rows is buffered at a time
+    with _engine.connect() as conn:
+        streaming = conn.execution_options(stream_results=True)
+        chunks = list(pd.read_sql(query, streaming, params=tuple(params) or None,
+                                  chunksize=EMPLOYEE_CHUNK_SIZE))
     
+    if not chunks:
+        return pd.DataFrame(columns=list(columns or EMPLOYEE_LIST_COLUMNS))
+    return pd.concat(chunks, ignore_index=True, copy=False)
+
+def load_employee_data(engine, status_filter, dept_filter, bu_filter, columns=None):
+    """Cached employee list, reporting a failed query on the page"""
+    # Errors are raised rather than returned by the cached query, so they are never cached
     try:
-        if engine:
-            df = pd.read_sql(query, engine, params=(employee_code,))
-        else:
-            # For direct database connection, use different parameter style
-            if hasattr(db_pool, 'execute'):
-                # If it's a connection object
-                df = pd.read_sql(query, db_pool, params=(employee_code,))
-            else:
-                # If it's a different type of connection, try without params keyword
-                df = pd.read_sql(query, db_pool, params=[employee_code])
-        return df.iloc[0] if not df.empty else None
+        return query_employee_data(engine, status_filter, dept_filter, bu_filter, columns)
     except Exception as e:
-        # Try alternative parameter passing methods
-        try:
-            query_alt = query.replace('%s', '?')  # Try with ? placeholder
-            if engine:
-                df = pd.read_sql(query_alt, engine, params=[employee_code])
-            else:
-                df = pd.read_sql(query_alt, db_pool, params=[employee_code])
-            return df.iloc[0] if not df.empty else None
-        except Exception as e2:
-            # Last resort: use string formatting (less secure but compatible)
-            try:
-                query_formatted = f"""
-                SELECT 
-                    e.*,
-                    d.department_name,
-                    d.business_unit,
-                    des.designation_name,
-                    des.level as designation_level,
-                    ep.gender,
-                    ep.date_of_birth,
-                    ep.marital_status,
-                    ep.present_address,
-                    ep.permanent_address,
-                    ep.pan_number,
-                    ep.aadhaar_number,
-                    ef.bank_name,
-                    ef.account_number,
-                    ef.ifsc_code,
-                    mgr.employee_name as manager_name,
-                    ee.exit_date,
-                    ee.last_working_date,
-                    ee.exit_reason,
-                    ee.exit_comments
-                FROM employee e
-                LEFT JOIN department d ON e.department_id = d.department_id
-                LEFT JOIN designation des ON e.designation_id = des.designation_id
-                LEFT JOIN employee_personal ep ON e.employee_code = ep.employee_code
-                LEFT JOIN employee_financial ef ON e.employee_code = ef.employee_code
-                LEFT JOIN employee mgr ON e.primary_manager_id = mgr.employee_code
-                LEFT JOIN employee_exit ee ON e.employee_code = ee.employee_code
-                WHERE e.employee_code = '{employee_code}'
-                """
-                if engine:
-                    df = pd.read_sql(query_formatted, engine)
-                else:
-                    df = pd.read_sql(query_formatted, db_pool)
-                return df.iloc[0] if not df.empty else None
-            except Exception as e3:
-                st.error(f"Error loading employee details: {e}")
-                st.error(f"Alternative method also failed: {e2}")
-                st.error(f"String formatting method failed: {e3}")
-                return None
-
-def load_employee_projects(engine, db_pool, employee_code):
-    """Load employee project allocation and timesheet data"""
+        st.error(f"Error loading employee data: {e}")
+        return pd.DataFrame()
+
+# Columns that come from the project side of the employee profile query
+PROJECT_COLUMNS = [
+    'project_id', 'project_name', 'client_name', 'project_status',
+    'project_start_date', 'project_end_date', 'allocation_percentage',
+    'effective_from', 'effective_to', 'allocation_status', 'change_reason',
+    'total_hours_logged', 'total_days_worked', 'project_work_status'
+]
+
+# Typed up front so pandas works on datetime64 / float columns instead of
+# object columns of date and Decimal values
+PROJECT_DATE_COLUMNS = ['project_start_date', 'project_end_date', 'effective_from', 'effective_to']
+PROJECT_NUMERIC_DTYPES = {
+    'allocation_percentage': 'float64',
+    'total_hours_logged': 'float64',
+    'total_days_worked': 'int64'
+}
+
+@st.cache_data(ttl=EMPLOYEE_CACHE_TTL, show_spinner=False)
+def query_employee_profile(_engine, employee_code):
+    """Load an employee's details and project history in one round trip.
+
+    The employee row is repeated on every project row, so it is split back
+    into a details Series and a projects DataFrame here.
+    """
+    # Every lookup here is an index probe on employee_code: the PKs / UNIQUE keys of
+    # employee, employee_personal, employee_financial and employee_exit, plus
+    # ix_pa_emp_status_proj (project_allocation) and ix_ts_emp_proj (timesheet,
+    # covering hours_worked) from core/tables.py
     query = """
-    SELECT 
-        p.project_id,
-        p.project_name,
-        p.client_name,
-        p.status as project_status,
-        p.start_date as project_start_date,
-        p.end_date as project_end_date,
-        pa.allocation_percentage,
-        pa.effective_from,
-        pa.effective_to,
-        pa.status as allocation_status,
-        pa.change_reason,
-        COALESCE(ts.total_hours, 0) as total_hours_logged,
-        COALESCE(ts.total_days, 0) as total_days_worked,
-        CASE 
-            WHEN pa.effective_to IS NULL OR pa.effective_to > CURRENT_DATE 
-            THEN 'Active' 
-            ELSE 'Completed' 
-        END as project_work_status
-    FROM project_allocation pa
-    JOIN project p ON pa.project_id = p.project_id
-    LEFT JOIN (
+    WITH emp AS (
         SELECT 
-            project_id,
-            SUM(hours_worked) as total_hours,
-            COUNT(DISTINCT work_date) as total_days
-        FROM timesheet 
-        WHERE employee_code = %s
-        GROUP BY project_id
-    ) ts ON p.project_id = ts.project_id
-    WHERE pa.employee_code = %s
-    ORDER BY pa.effective_from DESC, p.project_name
+            e.*,
+            d.department_name,
+            d.business_unit,
+            des.designation_name,
+            des.level as designation_level,
+            ep.gender,
+            ep.date_of_birth,
+            ep.marital_status,
+            ep.present_address,
+            ep.permanent_address,
+            ep.pan_number,
+            ep.aadhaar_number,
+            ef.bank_name,
+            ef.account_number,
+            ef.ifsc_code,
+            mgr.employee_name as manager_name,
+            ee.exit_date,
+            ee.last_working_date,
+            ee.exit_reason,
+            ee.exit_comments
+        FROM employee e
+        LEFT JOIN department d ON e.department_id = d.department_id
+        LEFT JOIN designation des ON e.designation_id = des.designation_id
+        LEFT JOIN employee_personal ep ON e.employee_code = ep.employee_code
+        LEFT JOIN employee_financial ef ON e.employee_code = ef.employee_code
+        LEFT JOIN employee mgr ON e.primary_manager_id = mgr.employee_code
+        LEFT JOIN employee_exit ee ON e.employee_code = ee.employee_code
+        WHERE e.employee_code = %s
+    )
+    SELECT emp.*, proj.*
+    FROM emp
+    LEFT JOIN LATERAL (
+        -- One row per project and period; repeated allocation rows are collapsed here
+        SELECT DISTINCT ON (p.project_name, pa.effective_from, pa.effective_to)
+            p.project_id,
+            p.project_name,
+            p.client_name,
+            p.status as project_status,
+            p.start_date as project_start_date,
+            p.end_date as project_end_date,
+            pa.allocation_percentage,
+            pa.effective_from,
+            pa.effective_to,
+            pa.status as allocation_status,
+            pa.change_reason,
+            COALESCE(ts.total_hours, 0) as total_hours_logged,
+            COALESCE(ts.total_days, 0) as total_days_worked,
+            CASE 
+                WHEN pa.effective_to IS NULL OR pa.effective_to > CURRENT_DATE 
+                THEN 'Active' 
+                ELSE 'Completed' 
+            END as project_work_status
+        FROM project_allocation pa
+        JOIN project p ON pa.project_id = p.project_id
+        LEFT JOIN (
+            SELECT 
+                project_id,
+                SUM(hours_worked) as total_hours,
+                COUNT(DISTINCT work_date) as total_days
+            FROM timesheet 
+            WHERE employee_code = emp.employee_code
+            GROUP BY project_id
+        ) ts ON p.project_id = ts.project_id
+        WHERE pa.employee_code = emp.employee_code
+        ORDER BY p.project_name, pa.effective_from, pa.effective_to, pa.allocation_id DESC
+    ) proj ON TRUE
+    ORDER BY proj.effective_from DESC, proj.project_name
     """
     
+    df = pd.read_sql(query.replace('%s', placeholder_for(_engine)), _engine, params=(employee_code,),
+                     parse_dates=PROJECT_DATE_COLUMNS)
+    
+    if df.empty:
+        return None, pd.DataFrame(columns=PROJECT_COLUMNS)
+    
+    details = df.iloc[0].drop(PROJECT_COLUMNS)
+    projects = (
+        df.loc[df['project_id'].notna(), PROJECT_COLUMNS]
+        .astype(PROJECT_NUMERIC_DTYPES)
+        .reset_index(drop=True)
+    )
+    return details, projects
+
+def load_employee_profile(engine, employee_code):
+    """Cached employee profile, reporting a failed query on the page"""
+    # Errors are raised rather than returned by the cached query, so they are never cached
     try:
-        if engine:
-            df = pd.read_sql(query, engine, params=(employee_code, employee_code))
-        else:
-            # For direct database connection, use different parameter style
-            if hasattr(db_pool, 'execute'):
-                df = pd.read_sql(query, db_pool, params=(employee_code, employee_code))
-            else:
-                df = pd.read_sql(query, db_pool, params=[employee_code, employee_code])
-        return df
+        return query_employee_profile(engine, employee_code)
     except Exception as e:
-        # Try alternative parameter passing methods
+        st.error(f"Error loading employee details: {e}")
+        return None, pd.DataFrame()
+
+@st.cache_resource
+def prefetch_executor():
+    """Thread pool for profile prefetches, created on first use rather than at import"""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="employee-prefetch")
+
+def prefetch_profile(ctx, engine, employee_code):
+    """Run the cached profile query on a pool thread under the requesting script's context"""
+    # Without a ScriptRunContext the cached function warns on every call from this thread
+    add_script_run_ctx(threading.current_thread(), ctx)
+    return query_employee_profile(engine, employee_code)
+
+def prefetch_neighbours(engine, employee_codes, selected_code):
+    """Warm the profile cache for the employees next to the selection in the picker"""
+    position = employee_codes.index(selected_code)
+    neighbours = employee_codes[max(position - EMPLOYEE_PREFETCH_RADIUS, 0):position + EMPLOYEE_PREFETCH_RADIUS + 1]
+    executor, ctx = prefetch_executor(), get_script_run_ctx()
+    st.session_state['employee_prefetch'] = {
+        code: executor.submit(prefetch_profile, ctx, engine, code)
+        for code in neighbours if code != selected_code
+    }
+
+def await_prefetch(employee_code):
+    """Let an in-flight prefetch for this employee finish instead of querying twice"""
+    pending = st.session_state.get('employee_prefetch', {}).get(employee_code)
+    if pending is not None:
         try:
-            query_alt = query.replace('%s', '?')  # Try with ? placeholder
-            if engine:
-                df = pd.read_sql(query_alt, engine, params=[employee_code, employee_code])
-            else:
-                df = pd.read_sql(query_alt, db_pool, params=[employee_code, employee_code])
-            return df
-        except Exception as e2:
-            # Last resort: use string formatting (less secure but compatible)
-            try:
-                query_formatted = f"""
-                SELECT 
-                    p.project_id,
-                    p.project_name,
-                    p.client_name,
-                    p.status as project_status,
-                    p.start_date as project_start_date,
-                    p.end_date as project_end_date,
-                    pa.allocation_percentage,
-                    pa.effective_from,
-                    pa.effective_to,
-                    pa.status as allocation_status,
-                    pa.change_reason,
-                    COALESCE(ts.total_hours, 0) as total_hours_logged,
-                    COALESCE(ts.total_days, 0) as total_days_worked,
-                    CASE 
-                        WHEN pa.effective_to IS NULL OR pa.effective_to > CURRENT_DATE 
-                        THEN 'Active' 
-                        ELSE 'Completed' 
-                    END as project_work_status
-                FROM project_allocation pa
-                JOIN project p ON pa.project_id = p.project_id
-                LEFT JOIN (
-                    SELECT 
-                        project_id,
-                        SUM(hours_worked) as total_hours,
-                        COUNT(DISTINCT work_date) as total_days
-                    FROM timesheet 
-                    WHERE employee_code = '{employee_code}'
-                    GROUP BY project_id
-                ) ts ON p.project_id = ts.project_id
-                WHERE pa.employee_code = '{employee_code}'
-                ORDER BY pa.effective_from DESC, p.project_name
-                """
-                if engine:
-                    df = pd.read_sql(query_formatted, engine)
-                else:
-                    df = pd.read_sql(query_formatted, db_pool)
-                return df
-            except Exception as e3:
-                st.error(f"Error loading project data: {e}")
-                st.error(f"Alternative method also failed: {e2}")
-                st.error(f"String formatting method failed: {e3}")
-                return pd.DataFrame()
+            pending.result(timeout=1)
+        except Exception:
+            # Timed out or failed; the cached loader will query (and report) directly
+            pass
+
+def clear_employee_caches():
+    """Drop cached employee lookups after new master data is loaded"""
+    query_employee_data.clear()
+    query_employee_profile.clear()
+
+def employee_fields(employee_data):
+    """Render every employee field to display text in one pass, 'N/A' where missing"""
+    emp_dict = employee_data.to_dict() if hasattr(employee_data, 'to_dict') else employee_data
+    # Explicit None/NaN/NaT checks; pd.isna dispatch is slow on scalars
+    return {
+        key: 'N/A' if value is None or value is pd.NaT or (isinstance(value, float) and value != value)
+        else str(value)
+        for key, value in emp_dict.items()
+    }
+
+def split_projects(project_data):
+    """Split allocations into active and completed with one mask.
+
+    Rows are already unique per project and period (DISTINCT ON in
+    load_employee_profile).
+    """
+    is_active = project_data['project_work_status'].to_numpy() == 'Active'
+    np.logical_or(is_active, project_data['effective_to'].isna().to_numpy(), out=is_active)
+    return project_data[is_active], project_data[~is_active]
 
 def display_employee_dashboard(employee_data, project_data):
     """Display comprehensive employee dashboard with proper document view"""
     
-    # Convert Series to dict for easier access
-    if hasattr(employee_data, 'to_dict'):
-        emp_dict = employee_data.to_dict()
-    else:
-        emp_dict = employee_data
-    
-    # Helper function to safely get values
-    def safe_get(key, default='N/A'):
-        value = emp_dict.get(key, default)
-        if pd.isna(value) or value is None:
-            return default
-        return str(value)
+    # Every field rendered to text once, 'N/A' where missing
+    fields = employee_fields(employee_data)
     
     # Employee Header
     st.markdown("---")
@@ -422,11 +437,11 @@ def display_employee_dashboard(employee_data, project_data):
     # Employee Basic Info Header
     col1, col2 = st.columns([2, 1])
     with col1:
-        st.markdown(f"## 👤 {safe_get('employee_name')}")
-        st.markdown(f"**Employee Code:** `{safe_get('employee_code')}`")
+        st.markdown(f"## 👤 {fields.get('employee_name', 'N/A')}")
+        st.markdown(f"**Employee Code:** `{fields.get('employee_code', 'N/A')}`")
     with col2:
-        status_color = "" if safe_get('status') == 'Active' else ""
-        st.markdown(f"**Status:** {status_color} {safe_get('status')}")
+        status_color = "" if fields.get('status', 'N/A') == 'Active' else ""
+        st.markdown(f"**Status:** {status_color} {fields.get('status', 'N/A')}")
     
     st.markdown("---")
     
@@ -439,36 +454,36 @@ def display_employee_dashboard(employee_data, project_data):
     
     with prof_col1:
         st.markdown(f"""
-        **Department:** {safe_get('department_name')}  
-        **Business Unit:** {safe_get('business_unit')}  
-        **Designation:** {safe_get('designation_name')}
+        **Department:** {fields.get('department_name', 'N/A')}  
+        **Business Unit:** {fields.get('business_unit', 'N/A')}  
+        **Designation:** {fields.get('designation_name', 'N/A')}
         """)
     
     with prof_col2:
         st.markdown(f"""
-        **Employee Type:** {safe_get('employee_type')}  
-        **Grade:** {safe_get('grade')}  
-        **Level:** {safe_get('level')}
+        **Employee Type:** {fields.get('employee_type', 'N/A')}  
+        **Grade:** {fields.get('grade', 'N/A')}  
+        **Level:** {fields.get('level', 'N/A')}
         """)
     
     with prof_col3:
-        total_exp = emp_dict.get('total_experience', 0)
-        if pd.isna(total_exp) or total_exp is None:
+        total_exp = fields.get('total_experience', 'N/A')
+        if total_exp == 'N/A':
             total_exp = 0
         st.markdown(f"""
-        **Date of Joining:** {safe_get('date_of_joining')}  
-        **Reporting Manager:** {safe_get('manager_name')}  
+        **Date of Joining:** {fields.get('date_of_joining', 'N/A')}  
+        **Reporting Manager:** {fields.get('manager_name', 'N/A')}  
         **Total Experience:** {total_exp} years
         """)
     
     # Contact Information
-    if safe_get('email') != 'N/A' or safe_get('mobile_number') != 'N/A':
+    if fields.get('email', 'N/A') != 'N/A' or fields.get('mobile_number', 'N/A') != 'N/A':
         st.markdown("###  Contact Information")
         contact_col1, contact_col2 = st.columns(2)
         with contact_col1:
-            st.markdown(f"**Email:** {safe_get('email')}")
+            st.markdown(f"**Email:** {fields.get('email', 'N/A')}")
         with contact_col2:
-            st.markdown(f"**Mobile:** {safe_get('mobile_number')}")
+            st.markdown(f"**Mobile:** {fields.get('mobile_number', 'N/A')}")
     
     st.markdown("---")
     
@@ -476,104 +491,19 @@ def display_employee_dashboard(employee_data, project_data):
     st.markdown("## PROJECT INFORMATION")
     
     if not project_data.empty:
-        # Remove duplicates based on project_name and effective dates
-        project_data_clean = project_data.drop_duplicates(
-            subset=['project_name', 'effective_from', 'effective_to'], 
-            keep='first'
-        )
-        
-        # Separate active and completed projects
-        active_projects = project_data_clean[
-            (project_data_clean['project_work_status'] == 'Active') | 
-            (pd.isna(project_data_clean['effective_to']))
-        ]
-        completed_projects = project_data_clean[
-            (project_data_clean['project_work_status'] != 'Active') & 
-            (~pd.isna(project_data_clean['effective_to']))
-        ]
+        active_projects, completed_projects = split_projects(project_data)
         
         # Current/Active Projects
         st.markdown(f"### Current Projects ({len(active_projects)})")
         if not active_projects.empty:
-            for idx, project in active_projects.iterrows():
-                with st.container():
-                    st.markdown(f"#### 📁 {project['project_name']}")
-                    
-                    # Project details in organized layout
-                    proj_col1, proj_col2, proj_col3, proj_col4 = st.columns(4)
-                    
-                    with proj_col1:
-                        st.markdown(f"""
-                        **Client:** {project.get('client_name', 'N/A')}  
-                        **Status:** Active
-                        """)
-                    
-                    with proj_col2:
-                        allocation = project.get('allocation_percentage', 0)
-                        allocation_display = f"{allocation}%" if allocation else "0%"
-                        st.markdown(f"""
-                        **Allocation:** {allocation_display}  
-                        **Duration:** {project.get('effective_from', 'N/A')} to Ongoing
-                        """)
-                    
-                    with proj_col3:
-                        hours = project.get('total_hours_logged', 0)
-                        hours_display = str(hours) if hours else "0"
-                        st.markdown(f"""
-                        **Hours Logged:** {hours_display}  
-                        **Days Worked:** {project.get('total_days_worked', 0)}
-                        """)
-                    
-                    with proj_col4:
-                        if project.get('change_reason'):
-                            st.markdown(f"""
-                            **Change Reason:** {project.get('change_reason', 'N/A')}
-                            """)
-                    
-                    st.markdown("---")
+            render_project_table(active_projects)
         else:
             st.info("🔍 No active projects found")
         
         # Completed/Previous Projects
         st.markdown(f"### Previous Projects ({len(completed_projects)})")
         if not completed_projects.empty:
-            for idx, project in completed_projects.iterrows():
-                with st.container():
-                    st.markdown(f"#### 📁 {project['project_name']}")
-                    
-                    # Project details in organized layout
-                    proj_col1, proj_col2, proj_col3, proj_col4 = st.columns(4)
-                    
-                    with proj_col1:
-                        st.markdown(f"""
-                        **Client:** {project.get('client_name', 'N/A')}  
-                        **Status:**  Completed
-                        """)
-                    
-                    with proj_col2:
-                        allocation = project.get('allocation_percentage', 0)
-                        allocation_display = f"{allocation}%" if allocation else "0%"
-                        effective_to = project.get('effective_to', 'N/A')
-                        st.markdown(f"""
-                        **Allocation:** {allocation_display}  
-                        **Duration:** {project.get('effective_from', 'N/A')} to {effective_to}
-                        """)
-                    
-                    with proj_col3:
-                        hours = project.get('total_hours_logged', 0)
-                        hours_display = str(hours) if hours else "0"
-                        st.markdown(f"""
-                        **Hours Logged:** {hours_display}  
-                        **Days Worked:** {project.get('total_days_worked', 0)}
-                        """)
-                    
-                    with proj_col4:
-                        if project.get('change_reason'):
-                            st.markdown(f"""
-                            **Change Reason:** {project.get('change_reason', 'N/A')}
-                            """)
-                    
-                    st.markdown("---")
+            render_project_table(completed_projects)
         else:
             st.info("🔍 No previous projects found")
             
@@ -582,303 +512,335 @@ def display_employee_dashboard(employee_data, project_data):
         summary_col1, summary_col2, summary_col3, summary_col4 = st.columns(4)
         
         with summary_col1:
-            st.metric("Total Projects", len(project_data_clean))
+            st.metric("Total Projects", len(project_data))
         with summary_col2:
             st.metric("Active Projects", len(active_projects))
         with summary_col3:
             st.metric("Completed Projects", len(completed_projects))
         with summary_col4:
-            total_hours = project_data_clean['total_hours_logged'].fillna(0).sum()
+            total_hours = np.nansum(project_data['total_hours_logged'].to_numpy())
             st.metric("Total Hours Logged", f"{total_hours}")
             
     else:
         st.info("🔍 No project information available for this employee")
     
     # SECTION 3: EXIT INFORMATION (if applicable)
-    if safe_get('exit_date') != 'N/A':
+    if fields.get('exit_date', 'N/A') != 'N/A':
         st.markdown("---")
         st.markdown("##  EXIT INFORMATION")
         
         exit_col1, exit_col2 = st.columns(2)
         with exit_col1:
             st.markdown(f"""
-            **Exit Date:** {safe_get('exit_date')}  
-            **Last Working Date:** {safe_get('last_working_date')}
+            **Exit Date:** {fields.get('exit_date', 'N/A')}  
+            **Last Working Date:** {fields.get('last_working_date', 'N/A')}
             """)
         with exit_col2:
             st.markdown(f"""
-            **Exit Reason:** {safe_get('exit_reason')}  
-            **Exit Comments:** {safe_get('exit_comments')}
+            **Exit Reason:** {fields.get('exit_reason', 'N/A')}  
+            **Exit Comments:** {fields.get('exit_comments', 'N/A')}
             """)
     
     st.markdown("---")
     st.markdown("*Report generated on: " + datetime.now().strftime("%Y-%m-%d %H:%M:%S") + "*")
 
+# Project columns shown in the dashboard tables, in display order
+PROJECT_TABLE_COLUMNS = [
+    'project_name', 'client_name', 'allocation_percentage', 'effective_from',
+    'effective_to', 'total_hours_logged', 'total_days_worked', 'change_reason'
+]
+
+def render_project_table(projects):
+    """Show a set of project allocations as one table instead of a block per project"""
+    st.dataframe(
+        projects.loc[:, PROJECT_TABLE_COLUMNS],
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "project_name": "Project",
+            "client_name": "Client",
+            "allocation_percentage": st.column_config.NumberColumn("Allocation", format="%d%%"),
+            "effective_from": st.column_config.DateColumn("From", format="YYYY-MM-DD"),
+            "effective_to": st.column_config.DateColumn("To", format="YYYY-MM-DD"),
+            "total_hours_logged": "Hours Logged",
+            "total_days_worked": "Days Worked",
+            "change_reason": "Change Reason"
+        }
+    )
+
+# Paragraph styles for the Employee Master PDF, built once at import rather than per report
+_pdf_base_styles = getSampleStyleSheet()
+
+PDF_TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=_pdf_base_styles['Heading1'],
+    fontSize=18,
+    textColor=colors.black,
+    alignment=TA_CENTER,
+    spaceBefore=0,
+    spaceAfter=24,
+    fontName='Helvetica-Bold'
+)
+
+PDF_SECTION_STYLE = ParagraphStyle(
+    'SectionHeader',
+    parent=_pdf_base_styles['Heading2'],
+    fontSize=12,
+    textColor=colors.black,
+    spaceBefore=20,
+    spaceAfter=12,
+    fontName='Helvetica-Bold',
+    borderWidth=1,
+    borderColor=colors.black,
+    borderPadding=3
+)
+
+PDF_SUBSECTION_STYLE = ParagraphStyle(
+    'SubSection',
+    parent=_pdf_base_styles['Heading3'],
+    fontSize=10,
+    textColor=colors.black,
+    spaceBefore=12,
+    spaceAfter=6,
+    fontName='Helvetica-Bold',
+    leftIndent=0
+)
+
+PDF_NORMAL_STYLE = ParagraphStyle(
+    'CustomNormal',
+    parent=_pdf_base_styles['Normal'],
+    fontSize=9,
+    spaceBefore=2,
+    spaceAfter=2,
+    leftIndent=0,
+    fontName='Helvetica'
+)
+
+PDF_TEXT_FIELD_STYLE = ParagraphStyle(
+    'FieldStyle',
+    parent=_pdf_base_styles['Normal'],
+    fontSize=9,
+    spaceBefore=1,
+    spaceAfter=1,
+    leftIndent=20,
+    fontName='Helvetica'
+)
+
+PDF_FOOTER_STYLE = ParagraphStyle('Footer', parent=_pdf_base_styles['Normal'], fontSize=8,
+                                  alignment=TA_CENTER, fontName='Helvetica')
+
+# Label/value blocks in the PDF: bold labels, indented like the old field paragraphs
+PDF_FIELD_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LEFTPADDING', (0, 0), (0, -1), 20),
+    ('TOPPADDING', (0, 0), (-1, -1), 1),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+])
+
+PDF_PROJECT_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LINEBELOW', (0, 0), (-1, 0), 0.5, colors.black),
+    ('TOPPADDING', (0, 0), (-1, -1), 1),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+])
+
+PDF_PROJECT_HEADER = ['Project', 'Client', 'Alloc.', 'From', 'To', 'Hours', 'Days', 'Change Reason']
+
+def field_table(rows):
+    """Lay out label/value pairs as one two-column table"""
+    return Table([[f"{label}:", value] for label, value in rows],
+                 colWidths=[1.75*inch, 5*inch], hAlign='LEFT', style=PDF_FIELD_STYLE)
+
+def project_table(projects, reason_style):
+    """Lay out project allocations as one table, one row per allocation"""
+    # Defaults and date formatting are applied column-wise; rows are then plain tuples
+    cells = projects.reindex(columns=PROJECT_TABLE_COLUMNS).fillna({'client_name': 'N/A', 'allocation_percentage': 0})
+    cells['effective_from'] = cells['effective_from'].dt.strftime('%Y-%m-%d').fillna('N/A')
+    cells['effective_to'] = cells['effective_to'].dt.strftime('%Y-%m-%d').fillna('Ongoing')
+    
+    data = [PDF_PROJECT_HEADER]
+    for name, client, allocation, start, end, hours, days, reason in cells.itertuples(index=False, name=None):
+        data.append([
+            name, client, f"{allocation:g}%", start, end, hours, days,
+            Paragraph(reason, reason_style) if isinstance(reason, str) else ''
+        ])
+    return Table(data, colWidths=[1.4*inch, 1.1*inch, 0.5*inch, 0.75*inch, 0.75*inch,
+                                  0.5*inch, 0.4*inch, 1.35*inch],
+                 hAlign='LEFT', repeatRows=1, style=PDF_PROJECT_STYLE)
+
 def generate_pdf_report(employee_data, project_data):
     """Generate comprehensive PDF report with professional document layout"""
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.75*inch, bottomMargin=0.75*inch,
                           leftMargin=0.75*inch, rightMargin=0.75*inch)
-    styles = getSampleStyleSheet()
     story = []
     
-    # Convert Series to dict if needed
-    if hasattr(employee_data, 'to_dict'):
-        emp_dict = employee_data.to_dict()
-    else:
-        emp_dict = employee_data
-    
-    # Helper function to safely get values
-    def safe_get(key, default='N/A'):
-        value = emp_dict.get(key, default)
-        if pd.isna(value) or value is None:
-            return default
-        return str(value)
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        textColor=colors.black,
-        alignment=TA_CENTER,
-        spaceBefore=0,
-        spaceAfter=24,
-        fontName='Helvetica-Bold'
-    )
-    
-    section_style = ParagraphStyle(
-        'SectionHeader',
-        parent=styles['Heading2'],
-        fontSize=12,
-        textColor=colors.black,
-        spaceBefore=20,
-        spaceAfter=12,
-        fontName='Helvetica-Bold',
-        borderWidth=1,
-        borderColor=colors.black,
-        borderPadding=3
-    )
-    
-    subsection_style = ParagraphStyle(
-        'SubSection',
-        parent=styles['Heading3'],
-        fontSize=10,
-        textColor=colors.black,
-        spaceBefore=12,
-        spaceAfter=6,
-        fontName='Helvetica-Bold',
-        leftIndent=0
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=9,
-        spaceBefore=2,
-        spaceAfter=2,
-        leftIndent=0,
-        fontName='Helvetica'
-    )
-    
-    field_style = ParagraphStyle(
-        'FieldStyle',
-        parent=styles['Normal'],
-        fontSize=9,
-        spaceBefore=1,
-        spaceAfter=1,
-        leftIndent=20,
-        fontName='Helvetica'
-    )
+    # Every field rendered to text once, 'N/A' where missing
+    fields = employee_fields(employee_data)
     
     # Document Header
-    story.append(Paragraph("EMPLOYEE MASTER REPORT", title_style))
-    story.append(Paragraph("_" * 100, normal_style))
+    story.append(Paragraph("EMPLOYEE MASTER REPORT", PDF_TITLE_STYLE))
+    story.append(Paragraph("_" * 100, PDF_NORMAL_STYLE))
     story.append(Spacer(1, 12))
     
     # Employee Basic Information
-    story.append(Paragraph(f"<b>Employee Name:</b> {safe_get('employee_name')}", normal_style))
-    story.append(Paragraph(f"<b>Employee Code:</b> {safe_get('employee_code')}", normal_style))
-    story.append(Paragraph(f"<b>Status:</b> {safe_get('status')}", normal_style))
-    story.append(Paragraph(f"<b>Report Generated:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", normal_style))
+    story.append(Paragraph(f"<b>Employee Name:</b> {fields.get('employee_name', 'N/A')}", PDF_NORMAL_STYLE))
+    story.append(Paragraph(f"<b>Employee Code:</b> {fields.get('employee_code', 'N/A')}", PDF_NORMAL_STYLE))
+    story.append(Paragraph(f"<b>Status:</b> {fields.get('status', 'N/A')}", PDF_NORMAL_STYLE))
+    story.append(Paragraph(f"<b>Report Generated:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", PDF_NORMAL_STYLE))
     story.append(Spacer(1, 16))
     
     # SECTION 1: PERSONAL & PROFESSIONAL INFORMATION
-    story.append(Paragraph("1. PERSONAL & PROFESSIONAL INFORMATION", section_style))
+    story.append(Paragraph("1. PERSONAL & PROFESSIONAL INFORMATION", PDF_SECTION_STYLE))
     
     # Professional Details
-    story.append(Paragraph("Professional Details", subsection_style))
-    story.append(Paragraph(f"<b>Department:</b> {safe_get('department_name')}", field_style))
-    story.append(Paragraph(f"<b>Business Unit:</b> {safe_get('business_unit')}", field_style))
-    story.append(Paragraph(f"<b>Designation:</b> {safe_get('designation_name')}", field_style))
-    story.append(Paragraph(f"<b>Level:</b> {safe_get('level')}", field_style))
-    story.append(Paragraph(f"<b>Employee Type:</b> {safe_get('employee_type')}", field_style))
-    story.append(Paragraph(f"<b>Grade:</b> {safe_get('grade')}", field_style))
-    story.append(Paragraph(f"<b>Date of Joining:</b> {safe_get('date_of_joining')}", field_style))
-    story.append(Paragraph(f"<b>Reporting Manager:</b> {safe_get('manager_name')}", field_style))
+    story.append(Paragraph("Professional Details", PDF_SUBSECTION_STYLE))
+    story.append(field_table([
+        ('Department', fields.get('department_name', 'N/A')),
+        ('Business Unit', fields.get('business_unit', 'N/A')),
+        ('Designation', fields.get('designation_name', 'N/A')),
+        ('Level', fields.get('level', 'N/A')),
+        ('Employee Type', fields.get('employee_type', 'N/A')),
+        ('Grade', fields.get('grade', 'N/A')),
+        ('Date of Joining', fields.get('date_of_joining', 'N/A')),
+        ('Reporting Manager', fields.get('manager_name', 'N/A')),
+    ]))
     story.append(Spacer(1, 8))
     
     # Experience Information
-    story.append(Paragraph("Experience Details", subsection_style))
-    total_exp = emp_dict.get('total_experience', 0)
-    if pd.isna(total_exp) or total_exp is None:
+    story.append(Paragraph("Experience Details", PDF_SUBSECTION_STYLE))
+    total_exp = fields.get('total_experience', 'N/A')
+    if total_exp == 'N/A':
         total_exp = 0
     
-    story.append(Paragraph(f"<b>Current Experience:</b> {safe_get('current_experience')} years", field_style))
-    story.append(Paragraph(f"<b>Past Experience:</b> {safe_get('past_experience')} years", field_style))
-    story.append(Paragraph(f"<b>Total Experience:</b> {total_exp} years", field_style))
+    story.append(field_table([
+        ('Current Experience', f"{fields.get('current_experience', 'N/A')} years"),
+        ('Past Experience', f"{fields.get('past_experience', 'N/A')} years"),
+        ('Total Experience', f"{total_exp} years"),
+    ]))
     story.append(Spacer(1, 8))
     
     # Contact Information
-    if safe_get('email') != 'N/A' or safe_get('mobile_number') != 'N/A':
-        story.append(Paragraph("Contact Information", subsection_style))
-        story.append(Paragraph(f"<b>Email:</b> {safe_get('email')}", field_style))
-        story.append(Paragraph(f"<b>Mobile Number:</b> {safe_get('mobile_number')}", field_style))
+    if fields.get('email', 'N/A') != 'N/A' or fields.get('mobile_number', 'N/A') != 'N/A':
+        story.append(Paragraph("Contact Information", PDF_SUBSECTION_STYLE))
+        story.append(field_table([
+            ('Email', fields.get('email', 'N/A')),
+            ('Mobile Number', fields.get('mobile_number', 'N/A')),
+        ]))
         story.append(Spacer(1, 8))
     
     # SECTION 2: PROJECT INFORMATION
-    story.append(Paragraph("2. PROJECT INFORMATION", section_style))
+    story.append(Paragraph("2. PROJECT INFORMATION", PDF_SECTION_STYLE))
     
     if not project_data.empty:
-        # Remove duplicates
-        project_data_clean = project_data.drop_duplicates(
-            subset=['project_name', 'effective_from', 'effective_to'], 
-            keep='first'
-        )
-        
-        # Separate active and completed projects
-        active_projects = project_data_clean[
-            (project_data_clean['project_work_status'] == 'Active') | 
-            (pd.isna(project_data_clean['effective_to']))
-        ]
-        completed_projects = project_data_clean[
-            (project_data_clean['project_work_status'] != 'Active') & 
-            (~pd.isna(project_data_clean['effective_to']))
-        ]
+        active_projects, completed_projects = split_projects(project_data)
         
         # Project Summary
-        story.append(Paragraph("Project Summary", subsection_style))
-        total_hours = project_data_clean['total_hours_logged'].fillna(0).sum()
-        total_days = project_data_clean['total_days_worked'].fillna(0).sum()
+        story.append(Paragraph("Project Summary", PDF_SUBSECTION_STYLE))
+        total_hours = np.nansum(project_data['total_hours_logged'].to_numpy())
+        total_days = np.nansum(project_data['total_days_worked'].to_numpy())
         
-        story.append(Paragraph(f"<b>Total Projects:</b> {len(project_data_clean)}", field_style))
-        story.append(Paragraph(f"<b>Active Projects:</b> {len(active_projects)}", field_style))
-        story.append(Paragraph(f"<b>Completed Projects:</b> {len(completed_projects)}", field_style))
-        story.append(Paragraph(f"<b>Total Hours Logged:</b> {total_hours}", field_style))
-        story.append(Paragraph(f"<b>Total Days Worked:</b> {total_days}", field_style))
+        story.append(field_table([
+            ('Total Projects', len(project_data)),
+            ('Active Projects', len(active_projects)),
+            ('Completed Projects', len(completed_projects)),
+            ('Total Hours Logged', total_hours),
+            ('Total Days Worked', total_days),
+        ]))
         story.append(Spacer(1, 12))
         
         # Current Projects
         if not active_projects.empty:
-            story.append(Paragraph(f"Current Projects ({len(active_projects)})", subsection_style))
+            story.append(Paragraph(f"Current Projects ({len(active_projects)})", PDF_SUBSECTION_STYLE))
             
-            for idx, project in active_projects.iterrows():
-                story.append(Paragraph(f"<b>Project:</b> {project['project_name']}", field_style))
-                story.append(Paragraph(f"    <b>Client:</b> {project.get('client_name', 'N/A')}", field_style))
-                story.append(Paragraph(f"    <b>Status:</b> Active", field_style))
-                story.append(Paragraph(f"    <b>Allocation:</b> {project.get('allocation_percentage', 0)}%", field_style))
-                story.append(Paragraph(f"    <b>Start Date:</b> {project.get('effective_from', 'N/A')}", field_style))
-                story.append(Paragraph(f"    <b>Duration:</b> {project.get('effective_from', 'N/A')} to Ongoing", field_style))
-                story.append(Paragraph(f"    <b>Hours Logged:</b> {project.get('total_hours_logged', 0)}", field_style))
-                story.append(Paragraph(f"    <b>Days Worked:</b> {project.get('total_days_worked', 0)}", field_style))
-                if project.get('change_reason'):
-                    story.append(Paragraph(f"    <b>Change Reason:</b> {project.get('change_reason')}", field_style))
-                story.append(Spacer(1, 6))
+            story.append(project_table(active_projects, PDF_NORMAL_STYLE))
+            story.append(Spacer(1, 6))
         
         # Previous Projects
         if not completed_projects.empty:
-            story.append(Paragraph(f"Previous Projects ({len(completed_projects)})", subsection_style))
+            story.append(Paragraph(f"Previous Projects ({len(completed_projects)})", PDF_SUBSECTION_STYLE))
             
-            for idx, project in completed_projects.iterrows():
-                story.append(Paragraph(f"<b>Project:</b> {project['project_name']}", field_style))
-                story.append(Paragraph(f"    <b>Client:</b> {project.get('client_name', 'N/A')}", field_style))
-                story.append(Paragraph(f"    <b>Status:</b> Completed", field_style))
-                story.append(Paragraph(f"    <b>Allocation:</b> {project.get('allocation_percentage', 0)}%", field_style))
-                story.append(Paragraph(f"    <b>Duration:</b> {project.get('effective_from', 'N/A')} to {project.get('effective_to', 'N/A')}", field_style))
-                story.append(Paragraph(f"    <b>Hours Logged:</b> {project.get('total_hours_logged', 0)}", field_style))
-                story.append(Paragraph(f"    <b>Days Worked:</b> {project.get('total_days_worked', 0)}", field_style))
-                if project.get('change_reason'):
-                    story.append(Paragraph(f"    <b>Change Reason:</b> {project.get('change_reason')}", field_style))
-                story.append(Spacer(1, 6))
+            story.append(project_table(completed_projects, PDF_NORMAL_STYLE))
+            story.append(Spacer(1, 6))
                 
     else:
-        story.append(Paragraph("No project information available for this employee.", field_style))
+        story.append(Paragraph("No project information available for this employee.", PDF_TEXT_FIELD_STYLE))
         story.append(Spacer(1, 12))
     
     # SECTION 3: EXIT INFORMATION (if applicable)
-    if safe_get('exit_date') != 'N/A':
-        story.append(Paragraph("3. EXIT INFORMATION", section_style))
-        story.append(Paragraph(f"<b>Exit Date:</b> {safe_get('exit_date')}", field_style))
-        story.append(Paragraph(f"<b>Last Working Date:</b> {safe_get('last_working_date')}", field_style))
-        story.append(Paragraph(f"<b>Exit Reason:</b> {safe_get('exit_reason')}", field_style))
-        story.append(Paragraph(f"<b>Exit Comments:</b> {safe_get('exit_comments')}", field_style))
+    if fields.get('exit_date', 'N/A') != 'N/A':
+        story.append(Paragraph("3. EXIT INFORMATION", PDF_SECTION_STYLE))
+        story.append(field_table([
+            ('Exit Date', fields.get('exit_date', 'N/A')),
+            ('Last Working Date', fields.get('last_working_date', 'N/A')),
+            ('Exit Reason', fields.get('exit_reason', 'N/A')),
+            ('Exit Comments', Paragraph(fields.get('exit_comments', 'N/A'), PDF_NORMAL_STYLE)),
+        ]))
         story.append(Spacer(1, 12))
     
     # Footer
     story.append(Spacer(1, 20))
-    story.append(Paragraph("_" * 100, normal_style))
+    story.append(Paragraph("_" * 100, PDF_NORMAL_STYLE))
     story.append(Spacer(1, 6))
     story.append(Paragraph(f"End of Report - Generated on {datetime.now().strftime('%Y-%m-%d at %H:%M:%S')}", 
-                          ParagraphStyle('Footer', parent=styles['Normal'], fontSize=8, 
-                                       alignment=TA_CENTER, fontName='Helvetica')))
+                          PDF_FOOTER_STYLE))
     
     # Build PDF
     doc.build(story)
     buffer.seek(0)
     return buffer.getvalue()
 
+# Project columns in the CSV export, mapped to their headers
+CSV_PROJECT_COLUMNS = {
+    'project_name': 'Project Name',
+    'client_name': 'Client',
+    'project_work_status': 'Project Status',
+    'allocation_percentage': 'Allocation %',
+    'total_hours_logged': 'Hours Logged',
+    'total_days_worked': 'Days Worked',
+    'effective_from': 'Start Date',
+    'effective_to': 'End Date'
+}
+
 def generate_csv_report(employee_data, project_data):
     """Generate CSV report"""
     
-    # Convert Series to dict if needed
-    if hasattr(employee_data, 'to_dict'):
-        emp_dict = employee_data.to_dict()
-    else:
-        emp_dict = employee_data
-    
-    # Helper function to safely get values
-    def safe_get(key, default='N/A'):
-        value = emp_dict.get(key, default)
-        if pd.isna(value) or value is None:
-            return default
-        return str(value)
+    # Every field rendered to text once, 'N/A' where missing
+    fields = employee_fields(employee_data)
     
-    # Combine employee and project data
-    combined_data = []
+    employee_columns = {
+        'Employee Code': fields.get('employee_code', 'N/A'),
+        'Employee Name': fields.get('employee_name', 'N/A'),
+        'Department': fields.get('department_name', 'N/A'),
+        'Designation': fields.get('designation_name', 'N/A'),
+    }
     
     if not project_data.empty:
-        for _, project in project_data.iterrows():
-            row = {
-                'Employee Code': safe_get('employee_code'),
-                'Employee Name': safe_get('employee_name'),
-                'Department': safe_get('department_name'),
-                'Designation': safe_get('designation_name'),
-                'Project Name': project['project_name'],
-                'Client': project.get('client_name', 'N/A'),
-                'Project Status': project['project_work_status'],
-                'Allocation %': project.get('allocation_percentage', 0),
-                'Hours Logged': project.get('total_hours_logged', 0),
-                'Days Worked': project.get('total_days_worked', 0),
-                'Start Date': project.get('effective_from', 'N/A'),
-                'End Date': project.get('effective_to', 'N/A')
-            }
-            combined_data.append(row)
+        # Column lists straight from the frame; missing values become empty cells as before
+        project_columns = []
+        for col in CSV_PROJECT_COLUMNS:
+            values = project_data[col]
+            if col in PROJECT_DATE_COLUMNS:
+                values = values.dt.strftime('%Y-%m-%d')
+            project_columns.append(values.astype(object).where(values.notna(), None).tolist())
+        # The employee fields repeat on every project row
+        employee_repeats = [itertools.repeat(value, len(project_data)) for value in employee_columns.values()]
+        rows = zip(*employee_repeats, *project_columns)
     else:
         # If no projects, just employee data
-        combined_data.append({
-            'Employee Code': safe_get('employee_code'),
-            'Employee Name': safe_get('employee_name'),
-            'Department': safe_get('department_name'),
-            'Designation': safe_get('designation_name'),
-            'Project Name': 'No Projects',
-            'Client': 'N/A',
-            'Project Status': 'N/A',
-            'Allocation %': 0,
-            'Hours Logged': 0,
-            'Days Worked': 0,
-            'Start Date': 'N/A',
-            'End Date': 'N/A'
-        })
-    
-    df = pd.DataFrame(combined_data)
-    return df.to_csv(index=False).encode('utf-8')
\ No newline at end of file
+        rows = [[*employee_columns.values(), 'No Projects', 'N/A', 'N/A', 0, 0, 0, 'N/A', 'N/A']]
+    
+    buf = io.BytesIO()
+    text = io.TextIOWrapper(buf, encoding='utf-8', newline='')
+    writer = csv.writer(text, lineterminator='\n')
+    writer.writerow([*employee_columns, *CSV_PROJECT_COLUMNS.values()])
+    writer.writerows(rows)
+    text.flush()
+    text.detach()
+    return buf.getvalue()
@@ -2,9 +2,63 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 from pathlib import Path
+import shutil
 from core.etl import ETLPipeline
 from config.config import etl_config, app_config
 from logs.activity_logger import get_logger
+from pages.custom_queries import query_filter_options
+from pages.employee_master import clear_employee_caches
+
+# Upload history is re-read at most this often, and right after files are processed
+UPLOAD_HISTORY_TTL = 30
+
+# Typed upload history columns; counts may be NULL, so they use the nullable integer dtype
+UPLOAD_HISTORY_DTYPES = {
+    'Processed': 'Int32',
+    'Success': 'Int32',
+    'Failed': 'Int32',
+    'Files': 'category',
+    'Status': 'category'
+}
+
+# Uploads are copied to the upload folder in chunks of this many bytes
+UPLOAD_COPY_CHUNK_SIZE = 1024 * 1024
+
+# Filename keyword -> ETL file type, checked in order; the first keyword found wins.
+# Longer names such as 'attendance_report' or 'employee_master' contain their keyword,
+# so one substring test per type is enough.
+FILE_TYPE_KEYWORDS = (
+    ('attendance', 'attendance_report'),
+    ('exit', 'employee_exit'),
+    ('work', 'work_profile'),
+    ('master', 'employee_master'),
+    ('experience', 'experience_report'),
+    ('timesheet', 'timesheet_report'),
+    ('allocation', 'project_allocations'),
+    ('resource', 'resource_utilization'),
+    ('utilization', 'resource_utilization'),
+)
+
+def detect_file_type(filename):
+    """Return the ETL file type for an uploaded filename, or None if unrecognized"""
+    filename_lower = filename.lower()
+    for keyword, file_type in FILE_TYPE_KEYWORDS:
+        if keyword in filename_lower:
+            return file_type
+    return None
+
+@st.cache_data(ttl=UPLOAD_HISTORY_TTL, show_spinner=False)
+def load_upload_history(_db_pool):
+    """Get the most recent uploads from csv_upload_log"""
+    with _db_pool.get_cursor() as cursor:
+        cursor.execute("""
+            SELECT upload_id, file_type, upload_timestamp, status,
+                   records_processed, records_success, records_failed
+            FROM csv_upload_log
+            ORDER BY upload_timestamp DESC
+            LIMIT 5
+        """)
+        return cursor.fetchall()
 
 def render_file_upload(db_pool):
     """Render the file upload page"""
@@ -26,61 +80,44 @@ def render_file_upload(db_pool):
         files_dict = {}
         unrecognized_files = []
 
-        # Process uploaded files silently
-        for uploaded_file in uploaded_files:
-            # Map file to type based on name (updated mapping)
-            file_type = None
-            filename_lower = uploaded_file.name.lower()
-            
-            # More flexible file type detection
-            if 'attendance' in filename_lower or 'attendance_report' in filename_lower:
-                file_type = 'attendance_report'
-            elif 'exit' in filename_lower or 'employee_exit' in filename_lower:
-                file_type = 'employee_exit'
-            elif 'work' in filename_lower or 'work_profile' in filename_lower or 'employee_work' in filename_lower:
-                file_type = 'work_profile'
-            elif 'employee_master' in filename_lower or 'master' in filename_lower:
-                file_type = 'employee_master'
-            elif 'experience' in filename_lower or 'experience_report' in filename_lower:
-                file_type = 'experience_report'
-            elif 'timesheet' in filename_lower:
-                file_type = 'timesheet_report'
-            elif 'allocation' in filename_lower or 'project_allocation' in filename_lower:
-                file_type = 'project_allocations'
-            elif 'resource' in filename_lower or 'utilization' in filename_lower:
-                file_type = 'resource_utilization'
-
-            if file_type:
-                # Save uploaded file
-                save_path = app_config.upload_folder / f"{file_type}_{uploaded_file.name}"
-                with open(save_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-                files_dict[file_type] = save_path
-                # Log file upload
-                logger.log_file_upload(
-                    filename=uploaded_file.name,
-                    file_type=file_type,
-                    user=st.session_state.get('username', 'anonymous'),
-                    status="SUCCESS",
-                    details={
-                        "user_full_name": st.session_state.get('user_full_name', 'Unknown'),
-                        "upload_time": str(datetime.now())
-                    }
-                )
-            else:
-                unrecognized_files.append(uploaded_file.name)
-                # Log unrecognized file
-                logger.log_event(
-                    event_type="FILE_UPLOAD",
-                    description=f"Unrecognized file: {uploaded_file.name}",
-                    user=st.session_state.get('username', 'anonymous'),
-                    details={
-                        "status": "FAILED", 
-                        "reason": "Unrecognized file type",
-                        "user_full_name": st.session_state.get('user_full_name', 'Unknown'),
-                        "upload_time": str(datetime.now())
-                    }
-                )
+        # Process uploaded files silently; their log entries are written in one transaction
+        with logger.batch():
+            for uploaded_file in uploaded_files:
+                # Map file to type based on name (updated mapping)
+                file_type = detect_file_type(uploaded_file.name)
+
+                if file_type:
+                    # Save uploaded file
+                    save_path = app_config.upload_folder / f"{file_type}_{uploaded_file.name}"
+                    uploaded_file.seek(0)
+                    with open(save_path, "wb") as f:
+                        shutil.copyfileobj(uploaded_file, f, UPLOAD_COPY_CHUNK_SIZE)
+                    files_dict[file_type] = save_path
+                    # Log file upload
+                    logger.log_file_upload(
+                        filename=uploaded_file.name,
+                        file_type=file_type,
+                        user=st.session_state.get('username', 'anonymous'),
+                        status="SUCCESS",
+                        details={
+                            "user_full_name": st.session_state.get('user_full_name', 'Unknown'),
+                            "upload_time": str(datetime.now())
+                        }
+                    )
+                else:
+                    unrecognized_files.append(uploaded_file.name)
+                    # Log unrecognized file
+                    logger.log_event(
+                        event_type="FILE_UPLOAD",
+                        description=f"Unrecognized file: {uploaded_file.name}",
+                        user=st.session_state.get('username', 'anonymous'),
+                        details={
+                            "status": "FAILED", 
+                            "reason": "Unrecognized file type",
+                            "user_full_name": st.session_state.get('user_full_name', 'Unknown'),
+                            "upload_time": str(datetime.now())
+                        }
+                    )
 
         # Show simple status message
         if files_dict:
@@ -96,16 +133,21 @@ def render_file_upload(db_pool):
                         # Initialize and run ETL pipeline
                         pipeline = ETLPipeline()
                         success, message, stats = pipeline.process_files(files_dict)
+                        # New employees, departments or projects change the report filters
+                        query_filter_options.clear()
+                        clear_employee_caches()
+                        load_upload_history.clear()
 
                         # Log file processing results
-                        for file_type, file_path in files_dict.items():
-                            logger.log_file_processing(
-                                filename=file_path.name,
-                                records_processed=stats.get('records_processed', 0),
-                                records_success=stats.get('records_success', 0),
-                                records_failed=stats.get('validation_errors', {}).get(file_type, 0),
-                                user=st.session_state.get('username', 'anonymous')
-                            )
+                        with logger.batch():
+                            for file_type, file_path in files_dict.items():
+                                logger.log_file_processing(
+                                    filename=file_path.name,
+                                    records_processed=stats.get('records_processed', 0),
+                                    records_success=stats.get('records_success', 0),
+                                    records_failed=stats.get('validation_errors', {}).get(file_type, 0),
+                                    user=st.session_state.get('username', 'anonymous')
+                                )
 
                         # Show simple results
                         if success:
@@ -135,30 +177,24 @@ def render_file_upload(db_pool):
     # Show upload history
     st.subheader("Upload History")
     try:
-        with db_pool.get_cursor() as cursor:
-            cursor.execute("""
-                SELECT upload_id, file_type, upload_timestamp, status,
-                       records_processed, records_success, records_failed
-                FROM csv_upload_log
-                ORDER BY upload_timestamp DESC
-                LIMIT 5
-            """)
-            uploads = cursor.fetchall()
-
-            if uploads:
-                df = pd.DataFrame(uploads, columns=[
-                    'Upload ID', 'Files', 'Timestamp', 'Status',
-                    'Processed', 'Success', 'Failed'
-                ])
-                st.dataframe(df, use_container_width=True)
-
-                # Show validation errors for selected upload
-                selected_upload = st.selectbox(
-                    "Select upload to view errors",
-                    options=[row[0] for row in uploads],
-                    format_func=lambda x: f"Upload {x}"
-                )
-
+        uploads = load_upload_history(db_pool)
+
+        if uploads:
+            df = pd.DataFrame.from_records(uploads, columns=[
+                'Upload ID', 'Files', 'Timestamp', 'Status',
+                'Processed', 'Success', 'Failed'
+            ]).astype(UPLOAD_HISTORY_DTYPES)
+            df['Timestamp'] = pd.to_datetime(df['Timestamp'])
+            st.dataframe(df, use_container_width=True)
+
+            # Show validation errors for selected upload
+            selected_upload = st.selectbox(
+                "Select upload to view errors",
+                options=[row[0] for row in uploads],
+                format_func=lambda x: f"Upload {x}"
+            )
+
+            with db_pool.get_cursor() as cursor:
                 cursor.execute("""
                     SELECT field_name, field_value, error_message
                     FROM data_validation_errors
@@ -166,14 +202,14 @@ def render_file_upload(db_pool):
                 """, (selected_upload,))
                 errors = cursor.fetchall()
 
-                if errors:
-                    with st.expander("View Validation Errors"):
-                        error_df = pd.DataFrame(errors, columns=[
-                            'Field', 'Value', 'Error'
-                        ])
-                        st.dataframe(error_df, use_container_width=True)
-            else:
-                st.info("No previous uploads found")
+            if errors:
+                with st.expander("View Validation Errors"):
+                    error_df = pd.DataFrame(errors, columns=[
+                        'Field', 'Value', 'Error'
+                    ])
+                    st.dataframe(error_df, use_container_width=True)
+        else:
+            st.info("No previous uploads found")
 
     except Exception as e:
         st.error(f"Error loading upload history: {e}")
@@ -183,4 +219,4 @@ def render_file_upload(db_pool):
             description=f"Error loading upload history: {str(e)}",
             user=st.session_state.get('user', 'anonymous'),
             details={"error": str(e)}
-        )
\ No newline at end of file
+        )
@@ -307,7 +307,7 @@ def render_standard_reports(engine=None, db_pool=None):
     
     # Tab 2: Employee Master Report
     with report_tabs[1]:
-        show_employee_master_report(engine, db_pool)
+        show_employee_master_report(engine)
 
 def show_project_master_report(engine=None, db_pool=None):
     """Display Enhanced Project Master Report"""